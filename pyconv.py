@@ -35,7 +35,59 @@
 #
 # ------------------------------------------------------------------------ #
 import sys;
+import os;
+import stat;
+import mmap;
 import re;
+import functools;
+
+# =============================================================================
+# Regular expressions, compiled once at start-up as they are applied to
+# every line of input
+#
+RE_EXPR_OPS = re.compile(r' (eq|ne) +(?:"|(\{\}))| (\&\&|\|\|) +')
+RE_EXPR_AFTER = re.compile(r"^ *\[after +(\d+|idle) +(.*)\] *$")
+RE_EXPR_AFTER_LIST = re.compile(r"^\[list +([A-Z][a-zA-Z0-9_]*)( +.*|)\]$")
+RE_EXPR_FCALL = re.compile(r"^ *\[ *([a-zA-Z][a-zA-Z0-9_]*|(?:\.[a-z][a-zA-Z0-9_]*)+)( +.*|)\] *$")
+RE_EXPR_EXPR = re.compile(r'^\[expr +\{(.*)\}\] *$')
+RE_EXPR_SIMPLE_FCALL = re.compile(r"^\[([A-Z][a-zA-Z0-9_]*|(?:\.[a-z][a-zA-Z0-9_]*)+)( +[^\[\]]*|)\]")
+RE_EXPR_LINDEX_END = re.compile(r"\[lindex \$([a-zA-Z][a-zA-Z0-9_]*) +end\]")
+RE_EXPR_LINDEX = re.compile(r"\[lindex \$([a-zA-Z][a-zA-Z0-9_]*) +")
+RE_EXPR_LRANGE = re.compile(r"\[lrange \$([a-zA-Z][a-zA-Z0-9_]*) +([^ \[\]]+) +([^ \[\]]+)\]")
+RE_EXPR_LLENGTH = re.compile(r"\[llength +\$([a-zA-Z][a-zA-Z0-9_]*)\]")
+RE_EXPR_IDX = re.compile(r'("?)\[expr \{([^\{\}\[\]]+)\}\](\.\d)\1')
+RE_EXPR_SUB_EXPR = re.compile(r'\[expr +\{([^\{\[\]\}]*)\}\] *$')
+
+# tokens in function parameter lists; alternatives are tried in the given order
+RE_PARL_TOKEN = re.compile(r'"(?P<str>(?:\\{2})*|[^ ]*?[^\\ ](?:\\{2})*)"(?: |$)'
+                           r'|\{(?P<brace>(?:\\{1})*|.*?[^\\](?:\\{1})*)\}(?: |$)'
+                           r'|\[(?P<cmd>(?:\\{1})*|.*?[^\\](?:\\{1})*)\](?: |$)'
+                           r'|(?P<idx>(?P<idx_q>"?)\[expr \{(?P<idx_expr>[^\{\}\[\]]+)\}\](?P<idx_pos>\.\d)(?P=idx_q))(?: |$)'
+                           r'|\$(?P<var>[a-zA-Z][a-zA-Z0-9_]*)(?: +|$)'
+                           r'|(?P<num>[0-9]+|0x[a-fA-F0-9]+)(?: +|$)'
+                           r'|(?P<widn>(?:\.[a-z][a-zA-Z0-9_]*)+)(?: |$)'
+                           r'|(?P<word>[a-zA-Z0-9_]+)(?: +|$)')
+
+RE_CMD_PAR = re.compile(r"^([a-zA-Z][a-zA-Z0-9_]*|(?:\.[a-z][a-zA-Z0-9_]*)+)( +.*|$)")
+
+RE_WPARL_VAL = re.compile(r'\-([a-z]+) +("((\\{3})*|(.*?[^\\](\\{3})*))"|[^\-"\{\[]\S*)( |$)')
+RE_WPARL_VAL_VAR = re.compile(r"^\$([a-zA-Z][a-zA-Z0-9_]+)$")
+RE_WPARL_VAL_NUM = re.compile(r"^([0-9]+|0x[0-9a-fA-F]+)$")
+RE_WPARL_VAL_WIDN = re.compile(r"^((?:\.[a-z][a-zA-Z0-9_]*)+)$")
+RE_WPARL_BRACE = re.compile(r"\-([a-z]+) +\{(((\\{2})*|(.*?[^\\](\\{2})*)))\}( |$)")
+RE_WPARL_CMD = re.compile(r"\-([a-z]+) +(\[((\\{2})*|(.*?[^\\](\\{2})*))\])( |$)")
+RE_WPARL_FLAG = re.compile(r"\-([a-z]+) +\-")
+RE_WPARL_FLAG_END = re.compile(r"-([a-z]+)( |$)")
+
+RE_WID_PARENT = re.compile(r"^(.*?)\.[^\.]+$")
+RE_WID_SUBCMD = re.compile(r"^(tag (add|configure|lower|raise|nextrange|prevrange)|add (command|cascade|separator|checkbutton|radiobutton)|mark (set)|[xy]view moveto|selection (clear|from|to))")
+RE_WID_OPN = re.compile(r"(\S+)( +.*)?")
+RE_WID_LIST = re.compile(r"((?:\.[a-z][a-zA-Z0-9_]*)+)( +|$)")
+
+RE_PROC_DEF = re.compile(r'\{([a-zA-Z][a-zA-Z0-9_]+) (?:(\{\}|"")|(\d+|0x[a-fA-F0-9]+)|([a-zA-Z][a-zA-Z0-9_]*))\}')
+RE_INCR_NEG = re.compile(r"\-(\d+)")
+RE_BIND_EVENT = re.compile(r"^(\<[a-zA-Z][a-zA-Z0-9\-]*\>) +")
+RE_BIND_BREAK = re.compile(r"^(.*)\; *break$")
 
 # =============================================================================
 # convert sub-expressions
@@ -43,30 +95,32 @@ import re;
 def conv_sub_expr(line):
   return line
 
-def conv_expr(line):
-  # string comparisons
-  line = re.sub(r' eq +"', r' == "', line)
-  line = re.sub(r' ne +"', r' != "', line)
-  line = re.sub(r' eq +{}', r' == ""', line)
-  line = re.sub(r' ne +{}', r' != ""', line)
+EXPR_OPS = { "eq": " == ", "ne": " != ", "&&": " and ", "||": " or " }
 
-  # boolean operators
-  line = re.sub(r' \&\& +', r' and ', line)
-  line = re.sub(r' \|\| +', r' or ', line)
+def conv_expr_op(match):
+  if match.group(1):
+    # string comparison with literal string or empty string {}
+    return EXPR_OPS[match.group(1)] + ('""' if match.group(2) else '"')
+  else:
+    return EXPR_OPS[match.group(3)]
+
+def conv_expr(line):
+  # string comparisons and boolean operators
+  line = RE_EXPR_OPS.sub(conv_expr_op, line)
 
   # complete expression is bareword
-  if re.match(r"^[a-zA-Z_][a-zA-Z0-9_]*$", line):
+  if line.isidentifier() and line.isascii():
     return '"' + line + '"'
 
   # empty list OR string
   if line == "{}": line = "None"
 
   # complete expression is "after" call (contains callback, to be treated specially)
-  match = re.match(r"^ *\[after +(\d+|idle) +(.*)\] *$", line)
+  match = RE_EXPR_AFTER.match(line)
   if match:
     delay = match.group(1)
     cmd = match.group(2).strip()
-    match2 = re.match(r"^\[list +([A-Z][a-zA-Z0-9_]*)( +.*|)\]$", cmd)
+    match2 = RE_EXPR_AFTER_LIST.match(cmd)
     if match2:
       funcn = match2.group(1)
       params = match2.group(2).strip()
@@ -76,7 +130,7 @@ def conv_expr(line):
       return "tk.after(" + delay + ", lambda: " + cmd + ")"
 
   # complete expression is function call
-  match = re.match(r"^ *\[ *([a-zA-Z][a-zA-Z0-9_]*|(?:\.[a-z][a-zA-Z0-9_]*)+)( +.*|)\] *$", line)
+  match = RE_EXPR_FCALL.match(line)
   if match:
     funcn = match.group(1)
     params = match.group(2).strip()
@@ -88,7 +142,7 @@ def conv_expr(line):
         return "%s(%s)" % (funcn, params)
 
   # complete expression is [expr ...]
-  line = re.sub(r'^\[expr +\{(.*)\}\] *$', r'\1', line)
+  line = RE_EXPR_EXPR.sub(r'\1', line)
 
   # contains simple function call (i.e. without nested [...])
   def conv_fcall_match(match):
@@ -100,24 +154,24 @@ def conv_expr(line):
       params = conv_parl(params)
       return "%s(%s)" % (funcn, params)
 
-  line = re.sub(r"^\[([A-Z][a-zA-Z0-9_]*|(?:\.[a-z][a-zA-Z0-9_]*)+)( +[^\[\]]*|)\]", conv_fcall_match, line)
+  line = RE_EXPR_SIMPLE_FCALL.sub(conv_fcall_match, line)
 
   # list lindex
-  line = re.sub(r"\[lindex \$([a-zA-Z][a-zA-Z0-9_]*) +end\]", r"\1[-1]", line)
-  line = re.sub(r"\[lindex \$([a-zA-Z][a-zA-Z0-9_]*) +", r"\1[", line)
+  line = RE_EXPR_LINDEX_END.sub(r"\1[-1]", line)
+  line = RE_EXPR_LINDEX.sub(r"\1[", line)
 
   # list lrange
-  line = re.sub(r"\[lrange \$([a-zA-Z][a-zA-Z0-9_]*) +([^ \[\]]+) +([^ \[\]]+)\]", r"\1[\2 : \3 + 1]", line)
+  line = RE_EXPR_LRANGE.sub(r"\1[\2 : \3 + 1]", line)
 
   # list length
-  line = re.sub(r"\[llength +\$([a-zA-Z][a-zA-Z0-9_]*)\]", r"len(\1)", line)
+  line = RE_EXPR_LLENGTH.sub(r"len(\1)", line)
 
   # sub-expression building string for text index %d.0 (without nested func calls)
-  line = re.sub(r'"\[expr \{([^\{\}\[\]]+)\}\](\.\d)"', r'"%d\2" % (\1)', line)
-  line = re.sub(r'\[expr \{([^\{\}\[\]]+)\}\](\.\d)', r'%d\2 % (\1)', line)
+  line = RE_EXPR_IDX.sub(lambda m: ('"%%d%s" %% (%s)' if m.group(1) else '%%d%s %% (%s)')
+                                   % (m.group(3), m.group(2)), line)
 
   # sub-expression [expr ...] (without nested func calls)
-  line = re.sub(r'\[expr +\{([^\{\[\]\}]*)\}\] *$', r'\1', line)
+  line = RE_EXPR_SUB_EXPR.sub(r'\1', line)
 
   return line
 
@@ -128,86 +182,39 @@ def conv_parl(params):
   orig_params = params
   ok = True
   parl = []
+  pos = 0
   while ok:
-    # string "..."
-    match = re.match(r'^"((\\{2})*|(.*?[^\\](\\{2})*))"( |$)', params)
-    if match:
-      val = match.group(1)
-      sep = match.group(5)
-      if not " " in val:
-        parl.append(val)
-        params = params[len(match.group(0)):]
-        continue
-
-    # string {...}
-    match = re.match(r"^\{((\\{1})*|(.*?[^\\](\\{1})*))\}( |$)", params)
-    if match:
-      val = match.group(1)
-      sep = match.group(5)
-      parl.append('"' + val + '"')
-      params = params[len(match.group(0)):]
-      continue
-
-    # command substitution [...]
-    match = re.match(r"^\[((\\{1})*|(.*?[^\\](\\{1})*))\]( |$)", params)
-    if match:
-      val = match.group(1)
-      sep = match.group(5)
-      parl.append(conv_expr("[" + val + "]"))
-      params = params[len(match.group(0)):]
-      continue
-
-  # sub-expression building string for text index %d.0 (without nested func calls)
-    match = re.match(r'^"\[expr \{([^\{\}\[\]]+)\}\](\.\d)"( |$)', params)
-    if not match:
-      match = re.match(r'^\[expr \{([^\{\}\[\]]+)\}\](\.\d)( |$)', params)
-    if match:
-      expr = match.group(1)
-      lstr = match.group(2)
-      sep = match.group(3)
-      parl.append('"%%d%s" %% (%s)' % (lstr, expr))
-      params = params[len(match.group(0)):]
-      continue
-
-    # variable $VAR
-    match = re.match(r"^\$([a-zA-Z][a-zA-Z0-9_]*)( +|$)", params)
-    if match:
-      val = match.group(1)
-      sep = match.group(2)
-      parl.append(val)
-      params = params[len(match.group(0)):]
-      continue
-
-    # number 1234 or 0xAFFE
-    match = re.match(r"^([0-9]+|0x[a-fA-F0-9]+)( +|$)", params)
-    if match:
-      val = match.group(1)
-      sep = match.group(2)
-      parl.append(val)
-      params = params[len(match.group(0)):]
-      continue
-
-    # widget name .dialog.frame.wid
-    match = re.match(r"^((?:\.[a-z][a-zA-Z0-9_]*)+)( |$)", params)
-    if match:
-      val = match.group(1)
-      sep = match.group(2)
-      parl.append(conv_widn(val))
-      params = params[len(match.group(0)):]
-      continue
+    if pos == len(params):
+      break
 
-    # bareword
-    match = re.match(r"^([a-zA-Z0-9_]+)( +|$)", params)
+    match = RE_PARL_TOKEN.match(params, pos)
     if match:
-      val = match.group(1)
-      sep = match.group(2)
-      parl.append('"' + val + '"')
-      params = params[len(match.group(0)):]
+      kind = match.lastgroup
+      val = match.group(kind)
+      if kind == "str":
+        # string "..." (without blanks)
+        parl.append(val)
+      elif kind == "brace":
+        # string {...}
+        parl.append('"' + val + '"')
+      elif kind == "cmd":
+        # command substitution [...]
+        parl.append(conv_expr("[" + val + "]"))
+      elif kind == "idx":
+        # sub-expression building string for text index %d.0 (without nested func calls)
+        parl.append('"%%d%s" %% (%s)' % (match.group("idx_pos"), match.group("idx_expr")))
+      elif kind == "widn":
+        # widget name .dialog.frame.wid
+        parl.append(conv_widn(val))
+      elif kind == "word":
+        # bareword
+        parl.append('"' + val + '"')
+      else:
+        # variable $VAR; number 1234 or 0xAFFE
+        parl.append(val)
+      pos = match.end()
       continue
 
-    if params == "":
-      break
-
     ok = False
   if ok:
     params = ", ".join(parl)
@@ -219,7 +226,7 @@ def conv_parl(params):
 # Convert parameter which contains a command (i.e. eval'ed)
 #
 def conv_cmd_par(params, bind_par=""):
-  match2 = re.match(r"^([a-zA-Z][a-zA-Z0-9_]*|(?:\.[a-z][a-zA-Z0-9_]*)+)( +.*|$)", params)
+  match2 = RE_CMD_PAR.match(params)
   if match2:
     cmd = match2.group(1)
     cmdpar = match2.group(2).strip()
@@ -239,7 +246,7 @@ def conv_cmd_par(params, bind_par=""):
 # =============================================================================
 # Convert widget option list to parameter list
 #
-WPARL_CONST = [
+WPARL_CONST = frozenset((
   'ACTIVE', 'ALL', 'ANCHOR', 'ARC', 'BASELINE', 'BEVEL', 'BOTH', 'BOTTOM',
   'BROWSE', 'BUTT', 'CASCADE', 'CENTER', 'CHAR', 'CHECKBUTTON', 'CHORD',
   'COMMAND', 'CURRENT', 'DISABLED', 'DOTBOX', 'E', 'END', 'EW', 'EXCEPTION',
@@ -249,15 +256,16 @@ WPARL_CONST = [
   'PAGES', 'PIESLICE', 'PROJECTING', 'RADIOBUTTON', 'RAISED', 'READABLE',
   'RIDGE', 'RIGHT', 'ROUND', 'S', 'SCROLL', 'SE', 'SEL', 'SEL_FIRST',
   'SEL_LAST', 'SEPARATOR', 'SINGLE', 'SOLID', 'SUNKEN', 'SW', 'TOP', 'TRUE',
-  'UNDERLINE', 'UNITS', 'VERTICAL', 'W', 'WORD', 'WRITABLE', 'X', 'Y', 'YES']
+  'UNDERLINE', 'UNITS', 'VERTICAL', 'W', 'WORD', 'WRITABLE', 'X', 'Y', 'YES'))
 
 def conv_wparl(params, is_strict):
   orig_params = params
   ok = True
   parl = []
+  pos = 0
   while ok:
     # option followed by parameter string, number, bareword or $variable
-    match = re.match("^\-([a-z]+) +(\"" r"((\\{3})*|(.*?[^\\](\\{3})*))" "\"|[^\-\"\{\[]\S*)( |$)", params)
+    match = RE_WPARL_VAL.match(params, pos)
     if match:
       opt = match.group(1)
       val = match.group(2)
@@ -267,40 +275,40 @@ def conv_wparl(params, is_strict):
         val = val_const
       elif val.startswith('"'):
         pass
-      elif re.match(r"^\$([a-zA-Z][a-zA-Z0-9_]+)$", val):
+      elif RE_WPARL_VAL_VAR.match(val):
         val = val[1:]
-      elif re.match(r"^([0-9]+|0x[0-9a-fA-F]+)$", val):
+      elif RE_WPARL_VAL_NUM.match(val):
         pass
-      elif re.match(r"^[a-z]*command$", opt):
+      elif opt.endswith("command"):
         # function call without parameters
         pass
-      elif re.match(r"^[a-z]*variable$", opt) and re.match(r"^[a-zA-Z][a-zA-Z0-9_]*", val):
+      elif opt.endswith("variable") and val[0].isalpha() and val[0].isascii():
         # variable reference
         pass
-      elif opt == "menu" and re.match(r"^((?:\.[a-z][a-zA-Z0-9_]*)+)$", val):
+      elif opt == "menu" and RE_WPARL_VAL_WIDN.match(val):
         val = conv_widn(val)
       else:
         val = '"' + val + '"'
       parl.append(opt + '=' + val)
-      params = params[len(match.group(0)):]
+      pos = match.end()
       continue
 
     # option followed by {...}
-    match = re.match(r"^\-([a-z]+) +\{(((\\{2})*|(.*?[^\\](\\{2})*)))\}( |$)", params)
+    match = RE_WPARL_BRACE.match(params, pos)
     if match:
       opt = match.group(1)
       val = match.group(2)
       sep = match.group(7)
-      if re.match(r"^[a-z]*command$", opt):
+      if opt.endswith("command"):
         val = conv_cmd_par(val)
       else:
         val = '"' + val + '"'
       parl.append(opt + '=' + val)
-      params = params[len(match.group(0)):]
+      pos = match.end()
       continue
 
     # option followed by [...]
-    match = re.match(r"^\-([a-z]+) +(\[((\\{2})*|(.*?[^\\](\\{2})*))\])( |$)", params)
+    match = RE_WPARL_CMD.match(params, pos)
     if match:
       opt = match.group(1)
       val = match.group(3)
@@ -308,51 +316,58 @@ def conv_wparl(params, is_strict):
 
       val = conv_parl(val)
       parl.append(opt + '=' + val)
-      params = params[len(match.group(0)):]
+      pos = match.end()
       continue
 
     # option without parameters (i.e. followed by another option)
-    match = re.match("^\-([a-z]+) +\-", params)
+    match = RE_WPARL_FLAG.match(params, pos)
     if match:
       opt = match.group(1)
-      sep = match.group(2)
       parl.append(opt + '=1')
-      params = params[len(match.group(0) - 1):]
+      pos = match.end() - 1
       continue
 
     # option without parameters at end of list
-    match = re.match("-([a-z]+)( |$)", params)
+    match = RE_WPARL_FLAG_END.match(params, pos)
     if match:
       opt = match.group(1)
       sep = match.group(2)
       parl.append(opt + '=1')
-      params = params[len(match.group(0)):]
+      pos = match.end()
       continue
 
-    if params == "":
+    if pos == len(params):
       break
 
     ok = False
   if ok:
     params = ", ".join(parl)
   elif not is_strict:
-    # some widget commands take plain parameters (i.e. not in form of "-opt" switches)
-    params = conv_parl(orig_params)
+    # some widget commands take plain parameters (i.e. not in form of "-opt"
+    # switches) following the options: keep options parsed so far, but append
+    # them after the plain parameters, as required for keyword arguments
+    plain = params[pos:].strip()
+    if (plain == "--") or plain.startswith("-- "):
+      plain = plain[2:].lstrip()
+    if plain != "":
+      parl.insert(0, conv_parl(plain))
+    params = ", ".join(parl)
   else:
     params = orig_params
   return params
 
 # =============================================================================
-# Convert widget name
+# Convert widget name (results are cached, as the same names occur many times)
 
+@functools.lru_cache(maxsize=None)
 def conv_widn(widn):
-  return "wt." + re.sub(r"\.", "_", widn)[1:]
+  return "wt." + widn[1:].replace(".", "_")
 
 # =============================================================================
 # Derive parent from widget name
 
 def conv_wid_parent(widn):
-  match = re.match(r"^(.*?)\.[^\.]+$", widn)
+  match = RE_WID_PARENT.match(widn)
   if match:
     wpar = match.group(1)
     if wpar != "":
@@ -368,10 +383,9 @@ def conv_wid_parent(widn):
 def conv_wid_call(widn, params):
     widn = conv_widn(widn)
     # join sub-command names
-    params = re.sub(r"^(tag (add|configure|lower|raise|nextrange|prevrange)|add (command|cascade|separator|checkbutton|radiobutton)|mark (set)|[xy]view moveto|selection (clear|from|to))",
-                    lambda m: re.sub(r" ", r"_", m.group(0)), params)
+    params = RE_WID_SUBCMD.sub(lambda m: m.group(0).replace(" ", "_"), params)
     # make first param into widget class method
-    match = re.match(r"(\S+)( +.*)?", params)
+    match = RE_WID_OPN.match(params)
     if match:
       opn = match.group(1)
       if opn == "raise": opn = "lift"
@@ -383,260 +397,273 @@ def conv_wid_call(widn, params):
       return "%s %s" % (widn, params)
 
 # =============================================================================
-# Main
+# Convert statements: each function handles one type of statement, receiving
+# the indentation and the sub-matches of the respective pattern in table
+# LINE_CONV as parameters
 #
-prev_close_block = 0
-prev_line_cont = ""
-line_idx = 0
-for line in sys.stdin:
-  line_idx += 1
 
-  if line.startswith("#X#"):
-    line = line[3:]
+# parameter with default value: empty string, number or bareword
+def conv_proc_def(match):
+  if match.group(2):
+    return match.group(1) + '=""'
+  elif match.group(3):
+    return match.group(1) + '=' + match.group(3)
+  else:
+    return match.group(1) + '="' + match.group(4) + '"'
+
+# function definition
+def conv_line_proc(indent, name, params):
+  params = RE_PROC_DEF.sub(conv_proc_def, params)
+  params = ", ".join(params.split())
+  output.append("%sdef %s(%s):\n" % (indent, name, params))
+
+# global definition
+def conv_line_global(indent, list):
+  list = ", ".join(list.split())
+  output.append("%sglobal %s\n" % (indent, list))
+
+# if/while
+def conv_line_if(indent, expr):
+  expr = conv_expr(expr)
+  output.append("%sif %s:\n" % (indent, expr))
+
+# elseif
+def conv_line_elseif(indent, expr):
+  expr = conv_expr(expr)
+  output.append("%selif %s:\n" % (indent, expr))
+
+# else
+def conv_line_else(indent):
+  output.append("%selse:\n" % (indent))
+
+# closing bracket
+def conv_line_close(indent):
+  global prev_close_block
+  if (prev_close_block + 1 != line_idx):
+    output.append("\n")
+  prev_close_block = line_idx
+
+# foreach
+def conv_line_foreach(indent, varn, expr, *unused):
+  if expr.startswith("{"):
+    expr = conv_expr(expr[1:-2])
+  elif expr.startswith("["):
+    expr = conv_expr(expr)
+  else:
+    expr = expr[1:]
+  output.append("%sfor %s in %s:\n" % (indent, varn, expr))
+
+# return expr
+def conv_line_return(indent, expr):
+  expr = conv_expr(expr)
+  output.append("%sreturn %s\n" % (indent, expr))
+
+# variable assignment
+def conv_line_set(indent, varn, expr):
+  expr = conv_expr(expr)
+  output.append("%s%s = %s\n" % (indent, varn, expr))
+
+# array variable assignment
+def conv_line_set_arr(indent, varn, idx, expr):
+  idx = conv_expr(idx)
+  expr = conv_expr(expr)
+  if expr == "{}": expr = None  # might also be ""
+  output.append("%s%s[%s] = %s\n" % (indent, varn, idx, expr))
+
+# variable unset
+def conv_line_unset(indent, varl):
+  for varn in varl.split():
+    output.append("%s%s = None\n" % (indent, varn))
+
+# incr
+def conv_line_incr(indent, varn, val):
+  val = val.strip()
+  match = RE_INCR_NEG.match(val)
+  if match:
+    output.append("%s%s -= %s\n" % (indent, varn, match.group(1)))
+  else:
+    output.append("%s%s += %s\n" % (indent, varn, val))
 
-  if line[-2:] == "\\\n":
-    if prev_line_cont != "":
-      prev_line_cont += " " + line[:-2].strip()
-    else:
-      prev_line_cont = line[:-2].rstrip()
-    continue
+# incr with step parameter
+def conv_line_incr1(indent, varn):
+  output.append("%s%s += 1\n" % (indent, varn))
 
-  if prev_line_cont != "":
-    line = prev_line_cont + " " + line.strip()
-    prev_line_cont = ""
+# list append
+def conv_line_lappend(indent, varn, expr):
+  expr = conv_expr(expr.strip())
+  output.append("%s%s.append(%s)\n" % (indent, varn, expr))
 
-  # function definition
-  match = re.match(r"^( *)proc +(\S+) +\{*(.*)\} *\{ *$", line)
-  if match:
-    indent = match.group(1)
-    name = match.group(2)
-    params = match.group(3)
-    params = re.sub(r'\{([a-zA-Z][a-zA-Z0-9_]+) (?:\{\}|"")\}', r'\1=""', params)
-    params = re.sub(r"\{([a-zA-Z][a-zA-Z0-9_]+) (\d+|0x[a-fA-F0-9]+)\}", r'\1=\2', params)
-    params = re.sub(r"\{([a-zA-Z][a-zA-Z0-9_]+) ([a-zA-Z][a-zA-Z0-9_]*)\}", r'\1="\2"', params)
-    params = re.sub(r" +", r", ", params)
-    print("%sdef %s(%s):" % (indent, name, params))
-    continue
-
-  # global definition
-  match = re.match(r"^( *)global +(.*)$", line)
-  if match:
-    indent = match.group(1)
-    list = match.group(2)
-    list = re.sub(r" +", r", ", list)
-    print("%sglobal %s" % (indent, list))
-    continue
-
-  # if/while
-  match = re.match(r"^( *)(?:if|while) +\{(.*)\} *\{ *$", line)
-  if match:
-    indent = match.group(1)
-    expr = conv_expr(match.group(2))
-    print("%sif %s:" % (indent, expr))
-    continue
+# function call
+def conv_line_fcall(indent, funcn, params):
+  params = conv_parl(params.strip())
+  output.append("%s%s(%s)\n" % (indent, funcn, params))
 
-  # elseif
-  match = re.match(r"^( *)\} *elseif +\{(.*)\} *\{ *$", line)
-  if match:
-    indent = match.group(1)
-    expr = conv_expr(match.group(2))
-    print("%selif %s:" % (indent, expr))
-    continue
+# widget function
+def conv_line_wid_call(indent, widn, params):
+  params = params.strip()
+  output.append(indent + conv_wid_call(widn, params) + "\n")
 
-  # else
-  match = re.match(r"^( *)\} *else *\{ *$", line)
-  if match:
-    indent = match.group(1)
-    print("%selse:" % (indent))
-    continue
+# widget creation
+def conv_line_wid_create(indent, cmd, widn, params):
+  params = params.strip()
 
-  # closing bracket
-  match = re.match(r"^() *\} *$", line)
-  if match:
-    indent = match.group(1)
-    if (prev_close_block + 1 != line_idx):
-      print(indent)
-    prev_close_block = line_idx
-    continue
-
-  # foreach
-  match = re.match(r"^( *)foreach (\S+) +(\{(.*)\}|\[(.*)\]|\$[a-zA-Z][a-zA-Z0-9_]*(?:\([^\)]*\))?) *\{ *$", line)
-  if match:
-    indent = match.group(1)
-    varn = match.group(2)
-    expr = match.group(3)
-    if expr.startswith("{"):
-      expr = conv_expr(expr[1:-2])
-    elif expr.startswith("["):
-      expr = conv_expr(expr)
-    else:
-      expr = expr[1:]
-    print("%sfor %s in %s:" % (indent, varn, expr))
-    continue
+  cmd = cmd[0].upper() + cmd[1:]
+  wid_parent = conv_wid_parent(widn)
+  widn = conv_widn(widn)
 
-  # return expr
-  match = re.match(r"^( *)return +(.*)$", line)
-  if match:
-    indent = match.group(1)
-    expr = conv_expr(match.group(2))
-    print("%sreturn %s" % (indent, expr))
-    continue
+  if params != "":
+    params = conv_wparl(params, True)
+    output.append("%s%s = %s(%s, %s)\n" % (indent, widn, cmd, wid_parent, params))
+  else:
+    output.append("%s%s = %s(%s)\n" % (indent, widn, cmd, wid_parent))
 
-  # variable assignment
-  match = re.match(r"^( *)set +([a-zA-Z][a-zA-Z0-9_]*) +(.*)$", line)
-  if match:
-    indent = match.group(1)
-    varn = match.group(2)
-    expr = conv_expr(match.group(3))
-    print("%s%s = %s" % (indent, varn, expr))
-    continue
-
-  # array variable assignment
-  match = re.match(r"^( *)set +([a-zA-Z][a-zA-Z0-9_]*)\(([^\)]*)\) +(.*)$", line)
-  if match:
-    indent = match.group(1)
-    varn = match.group(2)
-    idx = conv_expr(match.group(3))
-    expr = conv_expr(match.group(4))
-    if expr == "{}": expr = None  # might also be ""
-    print("%s%s[%s] = %s" % (indent, varn, idx, expr))
-    continue
-
-  # variable unset
-  match = re.match(r"^( *)unset +(?:\-nocomplain +)?(.*)$", line)
-  if match:
-    indent = match.group(1)
-    varl = re.sub(r"  +", r" ", match.group(2).strip())
-    for varn in varl.split(" "):
-      print("%s%s = None" % (indent, varn))
-    continue
-
-  # incr
-  match = re.match(r"^( *)incr ([a-zA-Z][a-zA-Z0-9_]*) +(\S.*)$", line)
-  if match:
-    indent = match.group(1)
-    varn = match.group(2)
-    val = match.group(3).strip()
-    match = re.match(r"\-(\d+)", val)
+# pack et.al.
+def conv_line_wid_mgr(indent, cmdn, widn, params):
+  widl = [widn]
+  params = params.strip()
+
+  cmdn = cmdn.replace(" ", "_")
+  if cmdn == "focus": cmdn = "focus_set"
+  elif cmdn == "raise": cmdn = "lift"
+
+  pos = 0
+  while True:
+    match = RE_WID_LIST.match(params, pos)
     if match:
-      print("%s%s -= %s" % (indent, varn, match.group(1)))
+      widl.append(match.group(1))
+      pos = match.end()
     else:
-      print("%s%s += %s" % (indent, varn, val))
-    continue
+      break
 
-  # incr with step parameter
-  match = re.match(r"^( *)incr ([a-zA-Z][a-zA-Z0-9_]*) *$", line)
-  if match:
-    indent = match.group(1)
-    varn = match.group(2)
-    print("%s%s += 1" % (indent, varn))
-    continue
+  params = conv_wparl(params[pos:], True)
 
-  # list append
-  match = re.match(r"^( *)lappend ([a-zA-Z][a-zA-Z0-9_]*) +(\S.*)$", line)
-  if match:
-    indent = match.group(1)
-    varn = match.group(2)
-    expr = conv_expr(match.group(3).strip())
-    print("%s%s.append(%s)" % (indent, varn, expr))
-    continue
-
-  # function call
-  match = re.match(r"^( *)([A-Z][a-zA-Z0-9_]*|scan)( +.*|)$", line)
-  if match:
-    indent = match.group(1)
-    funcn = match.group(2)
-    params = match.group(3).strip()
-    params = conv_parl(params)
-    print("%s%s(%s)" % (indent, funcn, params))
-    continue
-
-  # widget function
-  match = re.match(r"^( *)((?:\.[a-z][a-zA-Z0-9_]*)+) +(.*)$", line)
-  if match:
-    indent = match.group(1)
-    widn = match.group(2)
-    params = match.group(3).strip()
+  for widn in widl:
+    widn = conv_widn(widn)
+    output.append("%s%s.%s(%s)\n" % (indent, widn, cmdn, params))
 
-    print(indent + conv_wid_call(widn, params))
-    continue
+# bind
+def conv_line_bind(indent, widn, params):
+  params = params.strip()
 
-  # widget creation
-  match = re.match(r"^( *)(label|frame|button|message|listbox|spinbox|radiobutton|checkbutton|canvas|toplevel|text|entry|menu|menubar|scrollbar) +((?:\.[a-z][a-zA-Z0-9_]*)+)( +.*|)$", line)
-  if match:
-    indent = match.group(1)
-    cmd = match.group(2)
-    widn = match.group(3)
-    params = match.group(4).strip()
+  widn = conv_widn(widn)
 
-    cmd = cmd[0].upper() + cmd[1:]
-    wid_parent = conv_wid_parent(widn)
-    widn = conv_widn(widn)
+  match2 = RE_BIND_EVENT.match(params)
+  if match2:
+    kpar = '"' + match2.group(1) + '", '
+    params = params[len(match2.group(0)):]
+  else:
+    kpar = ""
 
-    if params != "":
-      params = conv_wparl(params, True)
-      print("%s%s = %s(%s, %s)" % (indent, widn, cmd, wid_parent, params))
-    else:
-      print("%s%s = %s(%s)" % (indent, widn, cmd, wid_parent))
-    continue
+  if len(params) >= 2 and params[0] == "{" and params[-1] == "}":
+    params = params[1:-1]
+  if len(params) >= 2 and params[0] == '"' and params[-1] == '"':
+    params = params[1:-1]
 
-  # pack et.al.
-  match = re.match(r"^( *)(pack|grid|destroy|focus|raise|wm [a-z_]+) +((?:\.[a-z][a-zA-Z0-9_]*)+)( .*|$)", line)
-  if match:
-    indent = match.group(1)
-    cmdn = match.group(2)
-    widl = [match.group(3)]
-    params = match.group(4).strip()
-
-    cmdn = re.sub(r" ", r"_", cmdn)
-    if cmdn == "focus": cmdn = "focus_set"
-    elif cmdn == "raise": cmdn = "lift"
-
-    while True:
-      match = re.match(r"^((?:\.[a-z][a-zA-Z0-9_]*)+)( +|$)", params)
-      if match:
-        widl.append(match.group(1))
-        params = params[len(match.group(0)):]
-      else:
-        break
+  match2 = RE_BIND_BREAK.match(params)
+  if match2:
+    params = "lambda e:BindCallAndBreak(" +  conv_cmd_par(match2.group(1)) + ")"
+  else:
+    params = conv_cmd_par(params, " e")
+
+  output.append("%s%s.bind(%s%s)\n" % (indent, widn, kpar, params))
+
+# Table of statement patterns and respective conversion functions; the
+# patterns are tried in the given order, so the first match takes precedence.
+# Patterns are applied to the line with leading blanks (i.e. indentation)
+# already removed.
+LINE_CONV = (
+  (r"proc +(\S+) +\{*(.*)\} *\{ *$", conv_line_proc),
+  (r"global +(.*)$", conv_line_global),
+  (r"(?:if|while) +\{(.*)\} *\{ *$", conv_line_if),
+  (r"\} *elseif +\{(.*)\} *\{ *$", conv_line_elseif),
+  (r"\} *else *\{ *$", conv_line_else),
+  (r"\} *$", conv_line_close),
+  (r"foreach (\S+) +(\{(.*)\}|\[(.*)\]|\$[a-zA-Z][a-zA-Z0-9_]*(?:\([^\)]*\))?) *\{ *$", conv_line_foreach),
+  (r"return +(.*)$", conv_line_return),
+  (r"set +([a-zA-Z][a-zA-Z0-9_]*) +(.*)$", conv_line_set),
+  (r"set +([a-zA-Z][a-zA-Z0-9_]*)\(([^\)]*)\) +(.*)$", conv_line_set_arr),
+  (r"unset +(?:\-nocomplain +)?(.*)$", conv_line_unset),
+  (r"incr ([a-zA-Z][a-zA-Z0-9_]*) +(\S.*)$", conv_line_incr),
+  (r"incr ([a-zA-Z][a-zA-Z0-9_]*) *$", conv_line_incr1),
+  (r"lappend ([a-zA-Z][a-zA-Z0-9_]*) +(\S.*)$", conv_line_lappend),
+  (r"([A-Z][a-zA-Z0-9_]*|scan)( +.*|)$", conv_line_fcall),
+  (r"((?:\.[a-z][a-zA-Z0-9_]*)+) +(.*)$", conv_line_wid_call),
+  (r"(label|frame|button|message|listbox|spinbox|radiobutton|checkbutton|canvas|toplevel|text|entry|menu|menubar|scrollbar) +((?:\.[a-z][a-zA-Z0-9_]*)+)( +.*|)$", conv_line_wid_create),
+  (r"(pack|grid|destroy|focus|raise|wm [a-z_]+) +((?:\.[a-z][a-zA-Z0-9_]*)+)( .*|$)", conv_line_wid_mgr),
+  (r"bind +((?:\.[a-z][a-zA-Z0-9_]*)+|\$[a-zA-Z][a-zA-Z0-9_]+)( .*|$)", conv_line_bind),
+)
+
+# Combine all statement patterns into a single alternation, so that each line
+# is matched only once. Each alternative is enclosed in a group named after
+# the conversion function; for that group, remember the index range of the
+# sub-matches that are to be passed to the function.
+def build_line_conv(table):
+  pats = []
+  handlers = {}
+  grp_idx = 0
+  for pat, func in table:
+    pats.append("(?P<%s>%s)" % (func.__name__, pat))
+    grp_cnt = re.compile(pat).groups
+    handlers[func.__name__] = (grp_idx + 1, grp_idx + 1 + grp_cnt, func)
+    grp_idx += grp_cnt + 1
+  return (re.compile("|".join(pats)), handlers)
+
+RE_LINE, LINE_CONV_HANDLERS = build_line_conv(LINE_CONV)
 
-    params = conv_wparl(params, True)
+# =============================================================================
+# Read the complete input text: when stdin is redirected from a regular file,
+# it is mapped into memory, avoiding copies through the stream buffer.
+#
+def read_input():
+  fd = sys.stdin.fileno()
+  st = os.fstat(fd)
+  if stat.S_ISREG(st.st_mode) and (st.st_size > 0):
+    with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+      data = mm[:].decode(sys.stdin.encoding, sys.stdin.errors)
+    # apply universal newline translation, same as the text stream would
+    if "\r" in data:
+      data = data.replace("\r\n", "\n").replace("\r", "\n")
+    return data
+  else:
+    return sys.stdin.read()
 
-    for widn in widl:
-      widn = conv_widn(widn)
-      print("%s%s.%s(%s)" % (indent, widn, cmdn, params))
-    continue
+# =============================================================================
+# Main
+#
+# converted lines are collected and written in a single call at the end
+output = []
+prev_close_block = 0
+prev_line_cont = ""
+line_idx = 0
+try:
+  for line in read_input().splitlines(keepends=True):
+    line_idx += 1
 
-  # bind
-  match = re.match(r"^( *)bind +((?:\.[a-z][a-zA-Z0-9_]*)+|\$[a-zA-Z][a-zA-Z0-9_]+)( .*|$)", line)
-  if match:
-    indent = match.group(1)
-    widn = match.group(2)
-    params = match.group(3).strip()
+    if line.startswith("#X#"):
+      line = line[3:]
 
-    widn = conv_widn(widn)
+    if line[-2:] == "\\\n":
+      if prev_line_cont != "":
+        prev_line_cont += " " + line[:-2].strip()
+      else:
+        prev_line_cont = line[:-2].rstrip()
+      continue
 
-    match2 = re.match(r"^(\<[a-zA-Z][a-zA-Z0-9\-]*\>) +", params)
-    if match2:
-      kpar = '"' + match2.group(1) + '", '
-      params = params[len(match2.group(0)):]
-    else:
-      kpar = ""
+    if prev_line_cont != "":
+      line = prev_line_cont + " " + line.strip()
+      prev_line_cont = ""
 
-    match2 = re.match(r"^\{(.*)\}$", params)
-    if match2:
-      params = match2.group(1)
-    match2 = re.match(r'^\"(.*)\"$', params)
-    if match2:
-      params = match2.group(1)
+    stripped = line.lstrip(" ")
+    indent = line[: len(line) - len(stripped)]
 
-    match2 = re.match(r"^(.*)\; *break$", params)
-    if match2:
-      params = "lambda e:BindCallAndBreak(" +  conv_cmd_par(match2.group(1)) + ")"
-    else:
-      params = conv_cmd_par(params, " e")
+    match = RE_LINE.match(stripped)
+    if match:
+      grp_first, grp_end, func = LINE_CONV_HANDLERS[match.lastgroup]
+      func(indent, *match.groups()[grp_first:grp_end])
+      continue
 
-    print("%s%s.bind(%s%s)" % (indent, widn, kpar, params))
-    continue
+    output.append(line)
 
-  print(line, end="")
+finally:
+  # also write the lines converted so far when the conversion fails
+  sys.stdout.write("".join(output))
@@ -25,7 +25,10 @@ import sys
 import os
 import errno
 import bisect
+import itertools
 import threading
+import queue
+import collections
 from datetime import datetime
 from datetime import timedelta
 import time
@@ -55,27 +58,43 @@ def InitResources():
   font_bold = tkf.Font(family="helvetica", size=9, weight=tkf.BOLD)
   font_hlink = tkf.Font(family="helvetica", size=7, weight=tkf.NORMAL, underline=1)
 
-  # bindings to allow scrolling a text widget with the mouse wheel
-  tk.bind_class("TextWheel", "<Button-4>", lambda e: e.widget.yview_scroll(-3, "units"))
-  tk.bind_class("TextWheel", "<Button-5>", lambda e: e.widget.yview_scroll(3, "units"))
-  tk.bind_class("TextWheel", "<MouseWheel>", lambda e: e.widget.yview_scroll(int(-(e.delta / 120) * 3), "units"))
-
   # bindings for a read-only text widget
   # copy allowed bindings from the regular text widget (i.e. move, mark, copy)
-  for event in ( "<ButtonPress-1>", "<ButtonRelease-1>", "<B1-Motion>", "<Double-Button-1>", "<Shift-Button-1>",
-                 "<Triple-Button-1>", "<Triple-Shift-Button-1>", "<Button-2>", "<B2-Motion>",
-                 "<<Copy>>", "<<Clear>>", "<Shift-Key-Tab>", "<Control-Key-Tab>", "<Control-Shift-Key-Tab>",
-                 "<Key-Prior>", "<Key-Next>",
-                 #"<Key-Down>", "<Key-Up>", "<Key-Left>", "<Key-Right>",
-                 "<Shift-Key-Left>", "<Shift-Key-Right>", "<Shift-Key-Up>", "<Shift-Key-Down>",
-                 "<Shift-Key-Next>", "<Shift-Key-Prior>", "<Control-Key-Down>", "<Control-Key-Up>",
-                 "<Control-Key-Left>", "<Control-Key-Right>", "<Control-Key-Next>", "<Control-Key-Prior>",
-                 "<Key-Home>", "<Key-End>", "<Shift-Key-Home>", "<Shift-Key-End>",
-                 #"<Control-Key-Home>", "<Control-Key-End>",
-                 "<Control-Shift-Key-Home>", "<Control-Shift-Key-End>",
-                 "<Control-Shift-Key-Left>", "<Control-Shift-Key-Right>", "<Control-Shift-Key-Down>",
-                 "<Control-Shift-Key-Up>", "<Control-Key-slash>" ):
-    tk.bind_class("TextReadOnly", event, tk.bind_class("Text", event))
+  text_ro_events = ( "<ButtonPress-1>", "<ButtonRelease-1>", "<B1-Motion>", "<Double-Button-1>", "<Shift-Button-1>",
+                     "<Triple-Button-1>", "<Triple-Shift-Button-1>", "<Button-2>", "<B2-Motion>",
+                     "<<Copy>>", "<<Clear>>", "<Shift-Key-Tab>", "<Control-Key-Tab>", "<Control-Shift-Key-Tab>",
+                     "<Key-Prior>", "<Key-Next>",
+                     #"<Key-Down>", "<Key-Up>", "<Key-Left>", "<Key-Right>",
+                     "<Shift-Key-Left>", "<Shift-Key-Right>", "<Shift-Key-Up>", "<Shift-Key-Down>",
+                     "<Shift-Key-Next>", "<Shift-Key-Prior>", "<Control-Key-Down>", "<Control-Key-Up>",
+                     "<Control-Key-Left>", "<Control-Key-Right>", "<Control-Key-Next>", "<Control-Key-Prior>",
+                     "<Key-Home>", "<Key-End>", "<Shift-Key-Home>", "<Shift-Key-End>",
+                     #"<Control-Key-Home>", "<Control-Key-End>",
+                     "<Control-Shift-Key-Home>", "<Control-Shift-Key-End>",
+                     "<Control-Shift-Key-Left>", "<Control-Shift-Key-Right>", "<Control-Shift-Key-Down>",
+                     "<Control-Shift-Key-Up>", "<Control-Key-slash>" )
+
+  # bindings for a selection text widget (listbox emulation)
+  # (uses non-standard cursor movement event bindings, hence not added here)
+  text_sel_events = ( "<Button-2>", "<B2-Motion>", "<Key-Prior>", "<Key-Next>",
+                      "<Shift-Key-Tab>", "<Control-Key-Tab>", "<Control-Shift-Key-Tab>" )
+
+  # bindings to allow scrolling a text widget with the mouse wheel are defined
+  # as Tcl scripts, as there is no need to invoke Python for these events;
+  # then copy the bindings inside of the Tcl interpreter using a single script
+  tk.eval("bind TextWheel <Button-4> {%%W yview scroll -3 units}\n"
+          "bind TextWheel <Button-5> {%%W yview scroll 3 units}\n"
+          "bind TextWheel <MouseWheel> {%%W yview scroll [expr {int(-(%%D / 120.0) * 3)}] units}\n"
+          "foreach ev {%s} {bind TextReadOnly $ev [bind Text $ev]}\n"
+          "foreach ev {%s} {bind TextSel $ev [bind Text $ev]}\n"
+          "foreach ev {<Button-4> <Button-5> <MouseWheel>} {\n"
+          "  bind TextReadOnly $ev [bind TextWheel $ev]\n"
+          "  bind TextSel $ev [bind TextWheel $ev]\n"
+          "}\n"
+          "bind TextReadOnly <Control-Key-c> [bind Text <<Copy>>]\n"
+          "bind TextReadOnly <Key-Tab> [bind Text <Control-Key-Tab>]\n"
+          "bind TextSel <Key-Tab> [bind Text <Control-Key-Tab>]"
+          % (" ".join(text_ro_events), " ".join(text_sel_events)))
 
   # since Tk 8.6 there are no event handlers for <Key-Up> in tag Text anymore
   tk.bind_class("TextReadOnly", "<Key-Up>", lambda e: CursorMoveUpDown(wt.f1_t, -1))
@@ -87,19 +106,30 @@ def InitResources():
   #<Shift-Key-Left> <Shift-Key-Right> <Shift-Key-Up> <Shift-Key-Down>
   tk.bind_class("TextReadOnly", "<Control-Key-slash>", lambda e: wt.f1_t.tag_add("sel", "1.0", "end"))
 
-  # bindings for a selection text widget (listbox emulation)
-  # (uses non-standard cursor movement event bindings, hence not added here)
-  for event in ( "<Button-2>", "<B2-Motion>", "<Key-Prior>", "<Key-Next>",
-                 "<Shift-Key-Tab>", "<Control-Key-Tab>", "<Control-Shift-Key-Tab>" ):
-    tk.bind_class("TextSel", event, tk.bind_class("Text", event))
-
-  for event in ( "<Button-4>", "<Button-5>", "<MouseWheel>" ):
-    tk.bind_class("TextReadOnly", event, tk.bind_class("TextWheel", event))
-    tk.bind_class("TextSel", event, tk.bind_class("TextWheel", event))
-
-  tk.bind_class("TextReadOnly", "<Control-Key-c>", tk.bind_class("Text", "<<Copy>>"))
-  tk.bind_class("TextReadOnly", "<Key-Tab>", tk.bind_class("Text", "<Control-Key-Tab>"))
-  tk.bind_class("TextSel", "<Key-Tab>", tk.bind_class("Text", "<Control-Key-Tab>"))
+  # helper procedures for cursor placement and scrolling, which are defined in
+  # Tcl as they combine several text widget commands (see CursorGotoIndex and
+  # YviewScroll) that are invoked at key auto-repeat rate
+  tk.eval("proc trowser_cursor_goto {w idx mode} {\n"
+          "  $w mark set insert $idx\n"
+          "  if {$mode ne {}} {$w xview moveto 0}\n"
+          "  if {$mode eq {first}} {\n"
+          "    set pos [$w search -regexp {\\S} insert {insert lineend}]\n"
+          "    if {$pos eq {}} {set pos {insert lineend}}\n"
+          "    $w mark set insert $pos\n"
+          "  }\n"
+          "  $w see insert\n"
+          "}\n"
+          "proc trowser_yview_scroll {w delta fh} {\n"
+          "  $w yview scroll $delta units\n"
+          "  set pos [$w bbox insert]\n"
+          "  if {($pos eq {}) || ([lindex $pos 3] < $fh)} {\n"
+          "    if {$delta < 0} {\n"
+          "      $w mark set insert \"@1,[winfo height $w] - 1 lines linestart\"\n"
+          "    } else {\n"
+          "      $w mark set insert @1,1\n"
+          "    }\n"
+          "  }\n"
+          "}")
 
   # bookmark image which is inserted into the text widget
   img_marker = tk.eval("image create photo -data "
@@ -113,7 +143,7 @@ def InitResources():
 # the search control dialog at the bottom.
 #
 def CreateMainWindow():
-  global font_content, col_bg_content, col_fg_content, fmt_selection
+  global font_content, font_content_applied, col_bg_content, col_fg_content, fmt_selection
   global win_geom, fmt_find, fmt_findinc
   global tlb_find, tlb_hall, tlb_case, tlb_regexp
 
@@ -169,6 +199,7 @@ def CreateMainWindow():
                  font=font_content, background=col_bg_content, foreground=col_fg_content,
                  cursor="top_left_arrow", relief=FLAT, exportselection=1)
   wt.f1_t.pack(side=LEFT, fill=BOTH, expand=1)
+  font_content_applied = font_content.actual()
   wt.f1_sb = Scrollbar(wt.f1, orient=VERTICAL, command=wt.f1_t.yview, takefocus=0)
   wt.f1_sb.pack(side=LEFT, fill=Y)
   wt.f1_t.configure(yscrollcommand=wt.f1_sb.set)
@@ -237,9 +268,10 @@ def CreateMainWindow():
   wt.f1_t.bind("<Control-minus>", lambda e: BindCallKeyClr(lambda:ChangeFontSize(-1)))
   wt.f1_t.bind("<Control-Alt-Delete>", lambda e: DebugDumpAllState())
   # catch-all (processes "KeyCmdBind" from above)
+  # (bound via Tcl script passing only the character, as this is invoked for every key press)
   wt.f1_t.bind("<FocusIn>", lambda e: KeyClr())
   wt.f1_t.bind("<Return>", lambda e: "break" if KeyCmd(wt.f1_t, "Return") else None)
-  wt.f1_t.bind("<KeyPress>", lambda e: "break" if KeyCmd(wt.f1_t, e.char) else None)
+  wt.f1_t.bind("<KeyPress>", "if {[%s %%A]} break" % wt.f1_t.register(KeyCmd_MainKeyPress))
 
   # frame #2: search controls
   wt.f2 = Frame(borderwidth=2, relief=RAISED)
@@ -284,7 +316,7 @@ def CreateMainWindow():
   tk.protocol(name="WM_DELETE_WINDOW", func=UserQuit)
   tk.geometry(win_geom["main_win"])
   tk.positionfrom(who="user")
-  wt.f1_t.bind("<Configure>", lambda e: ToplevelResized(e.widget, tk, wt.f1_t, "main_win"))
+  wt.f1_t.bind("<Configure>", lambda e: ToplevelResized(e.widget, tk, wt.f1_t, "main_win"), add="+")
 
   # dummy widget for xselection handling
   wt.xselection = Label()
@@ -309,6 +341,14 @@ def BindCallKeyClr(func):
   func()
   KeyClr()
 
+#
+# This function is bound to all key press events in the main text widget for
+# processing the commands registered via KeyCmdBind. The result is used by the
+# binding script for deciding if the event is further processed.
+#
+def KeyCmd_MainKeyPress(char):
+  return 1 if KeyCmd(wt.f1_t, char) else 0
+
 #
 # This function creates the requested bitmaps if they don't exist yet
 #
@@ -367,11 +407,14 @@ def HighlightCreateTags():
 # This function is called after loading a new text to apply the color
 # highlighting to the complete text. This means all matches on all
 # highlight patterns has to be searched for. Since this can take some
-# time, the operation done in the background to avoid blocking the user.
-# The CPU is given up voluntarily after each pattern and after max. 100ms
+# time, the search is done by a background thread on a copy of the text.
+# The matches are applied to the text widget by a timer-driven function
+# in the main thread, as Tk must not be accessed from other threads.
 #
 def HighlightInit():
-  global patlist, tid_high_init
+  global patlist, tid_high_init, high_init_abort, high_init_pats
+
+  HighlightInitCancel()
 
   if wt_exists(wt.hipro):
     wt.hipro.destroy()
@@ -389,8 +432,21 @@ def HighlightInit():
 
     wt.f1_t.configure(cursor="watch")
 
-    # trigger highlighting for the 1st pattern in the background
-    tid_high_init = tk.after(50, lambda: HighlightInitBg(0, cid, 0, 0))
+    # compile patterns in advance; the thread only works on copies of all data
+    pats = []
+    for w in patlist:
+      opt = Search_GetOptions(w[0], w[1], w[2])
+      pats.append((w[0], w[4], opt, Highlight_CompileRe(w[0], opt)))
+    high_init_pats = [(pat, tagnam, opt) for (pat, tagnam, opt, rx) in pats]
+
+    lines = HighlightGetLines()
+    results = queue.Queue()
+    abort = threading.Event()
+    high_init_abort = abort
+
+    # start searching in the background; results are polled by timer
+    threading.Thread(target=lambda: HighlightInit_BgLoop(lines, pats, results, abort), daemon=True).start()
+    tid_high_init = tk.after(50, lambda: HighlightInitBg(cid, pats, results, None, 0))
 
     # apply highlighting on the text in the visible area (this is quick)
     # use the yview callback to redo highlighting in case the user scrolls
@@ -398,81 +454,510 @@ def HighlightInit():
 
 
 #
-# This function is a slave-function of HighlightInit. The function
-# loops across all members in the global pattern list to apply color
-# the respective highlighting. The loop is broken up by installing each
-# new iteration as an idle event (and limiting each step to 100ms)
+# This function is executed by a background thread started by HighlightInit.
+# It searches the given copy of the text for all given patterns and passes
+# lists of matching line numbers to the main thread via the given queue.
+# Completion of each pattern is indicated by passing None instead of a list;
+# progress is reported by passing None as pattern index and a percentage.
+# Note this function must not access any Tk objects.
+#
+def HighlightInit_BgLoop(lines, pats, results, abort):
+  max_line = len(lines)
+
+  # first search all patterns which can be combined in a single pass: lines
+  # which match none of these can be skipped by searching only once
+  (rx_any, comb_idx) = Highlight_CombineRe(pats)
+  if comb_idx:
+    search_any = rx_any.search
+    searches = [pats[pat_idx][3].search for pat_idx in comb_idx]
+    matches = [[] for pat_idx in comb_idx]
+    for line in range(1, max_line):
+      txt = lines[line - 1]
+      if search_any(txt):
+        for idx in range(len(comb_idx)):
+          if searches[idx](txt):
+            matches[idx].append(line)
+
+      # pass results in portions, so that the main thread can apply them in parallel
+      if (line & 0x1FF) == 0:
+        if abort.is_set():
+          return
+        for idx in range(len(comb_idx)):
+          if matches[idx]:
+            results.put((comb_idx[idx], matches[idx]))
+            matches[idx] = []
+        results.put((None, 100 * line * len(comb_idx) // (max_line * len(pats))))
+
+    for idx in range(len(comb_idx)):
+      if matches[idx]:
+        results.put((comb_idx[idx], matches[idx]))
+      results.put((comb_idx[idx], None))
+
+  # search remaining patterns one after another
+  for pat_idx in range(len(pats)):
+    if pat_idx in comb_idx:
+      continue
+
+    (pat, tagnam, opt, rx) = pats[pat_idx]
+    if rx is not None:
+      literal = Highlight_GetLiteral(pat, opt)
+      search = rx.search
+      for line in range(1, max_line, 512):
+        end = min(line + 512, max_line)
+        if literal is not None:
+          matches = [lnum for lnum, txt in enumerate(lines[line - 1 : end - 1], line) if literal in txt]
+        else:
+          matches = [lnum for lnum, txt in enumerate(lines[line - 1 : end - 1], line) if search(txt)]
+        if matches:
+          results.put((pat_idx, matches))
+
+        if abort.is_set():
+          return
+
+    results.put((pat_idx, None))
+
+
+#
+# This function builds a reg.exp. which matches where any of the given
+# patterns matches, for use as pre-filter. Patterns with groups are excluded,
+# as back-references would refer to different group numbers. The function
+# returns the compiled reg.exp. and a list of indices of included patterns.
+#
+def Highlight_CombineRe(pats):
+  alt = []
+  comb_idx = []
+  for pat_idx in range(len(pats)):
+    rx = pats[pat_idx][3]
+    if (rx is not None) and (rx.groups == 0):
+      if rx.flags & re.IGNORECASE:
+        alt.append("(?i:" + rx.pattern + ")")
+      else:
+        alt.append("(?:" + rx.pattern + ")")
+      comb_idx.append(pat_idx)
+
+  if len(comb_idx) >= 2:
+    try:
+      return (re.compile("|".join(alt)), comb_idx)
+    except re.error:
+      # e.g. patterns containing global flags
+      pass
+
+  return (None, [])
+
+
+#
+# This function is a slave-function of HighlightInit. It is invoked via timer
+# to apply the results of the background thread to the text widget. Patterns
+# which cannot be compiled by Python are searched here via the text widget.
+# Each invocation is limited to 100ms to allow for user-interaction.
 #
-def HighlightInitBg(pat_idx, cid, line, loop_cnt):
+def HighlightInitBg(cid, pats, results, tk_pending, done_cnt):
   global block_bg_tasks, tid_search_inc, tid_search_hall, tid_search_list
-  global patlist, tid_high_init
+  global tid_high_init, high_init_abort, high_init_pats
 
   if block_bg_tasks or (tid_search_inc is not None) or (tid_search_hall is not None) or (tid_search_list is not None):
     # background tasks are suspended - re-schedule with timer
-    tid_high_init = tk.after(100, lambda:HighlightInitBg(pat_idx, cid, line, 0))
-  elif loop_cnt > 10:
-    # insert a small timer delay to allow for idle-driven interactive tasks (e.g. selections)
-    tid_high_init = tk.after(10, lambda:HighlightInitBg(pat_idx, cid, line, 0))
+    tid_high_init = tk.after(100, lambda: HighlightInitBg(cid, pats, results, tk_pending, done_cnt))
+    return
 
-  elif pat_idx < len(patlist):
-    w = patlist[pat_idx]
-    tagnam = w[4]
-    opt = Search_GetOptions(w[0], w[1], w[2])
-    loop_cnt += 1
+  # results for patterns which were changed or removed meanwhile are discarded
+  active = Highlight_PatlistKeys()
+  stale = [Highlight_CoveredKey(pat, tagnam, opt) not in active for (pat, tagnam, opt, rx) in pats]
+
+  deadline = time.monotonic_ns() + 100000000
+  while time.monotonic_ns() < deadline:
+    done_idx = -1
+    if tk_pending is not None:
+      (pat_idx, line) = tk_pending
+      (pat, tagnam, opt, rx) = pats[pat_idx]
+      if not stale[pat_idx]:
+        line = HighlightLines_TkSearch(pat, tagnam, opt, line)
+      else:
+        line = -1
+      if line >= 0:
+        tk_pending = (pat_idx, line)
+      else:
+        tk_pending = None
+        done_idx = pat_idx
+    else:
+      try:
+        (pat_idx, matches) = results.get_nowait()
+      except queue.Empty:
+        break
 
-    # here we do the actual work:
-    # apply the tag to all matching lines of text
-    line = HighlightLines(w[0], tagnam, opt, line)
+      if pat_idx is None:
+        # update the progress bar
+        wt.hipro_c.coords(cid, 0, 0, matches, 12)
 
-    if line >= 0:
-      # not done yet - reschedule
-      tid_high_init = tk.after_idle(lambda:HighlightInitBg(pat_idx, cid, line, loop_cnt))
+      elif matches is not None:
+        if stale[pat_idx]:
+          continue
+        # apply the tag to all matching lines of text
+        tagnam = pats[pat_idx][1]
+        HighlightAddTag(wt.f1_t, tagnam, matches)
+        # trigger the search result list dialog in case lines are included there too
+        SearchList_HighlightLines(tagnam, matches)
+
+      elif pats[pat_idx][3] is None:
+        # pattern not supported by Python's reg.exp. engine
+        tk_pending = (pat_idx, 1)
+      else:
+        done_idx = pat_idx
 
-    else:
-      # trigger next tag
-      pat_idx += 1
-      tid_high_init = tk.after_idle(lambda:HighlightInitBg(pat_idx, cid, 1, loop_cnt))
+    if done_idx >= 0:
+      (pat, tagnam, opt, rx) = pats[done_idx]
+      if not stale[done_idx]:
+        Highlight_AddCovered(Highlight_CoveredKey(pat, tagnam, opt), 1, len(HighlightGetLines()))
 
       # update the progress bar
-      wt.hipro_c.coords(cid, 0, 0, 100*pat_idx//len(patlist), 12)
-  else:
-    if wt_exists(wt.hipro):
-      wt.hipro.destroy()
-      wt.hipro = None
-    wt.f1_t.configure(cursor="top_left_arrow")
+      done_cnt += 1
+      wt.hipro_c.coords(cid, 0, 0, 100*done_cnt//len(pats), 12)
+
+      if done_cnt == len(pats):
+        # all done
+        if wt_exists(wt.hipro):
+          wt.hipro.destroy()
+          wt.hipro = None
+        wt.f1_t.configure(cursor="top_left_arrow")
+        tid_high_init = None
+        high_init_abort = None
+        high_init_pats = None
+        return
+
+  tid_high_init = tk.after(30, lambda: HighlightInitBg(cid, pats, results, tk_pending, done_cnt))
+
+
+#
+# This function stops the initial highlighting in case it's still ongoing.
+#
+def HighlightInitCancel():
+  global tid_high_init, high_init_abort, high_init_pats
+
+  high_init_pats = None
+  if tid_high_init is not None:
+    tk.after_cancel(tid_high_init)
     tid_high_init = None
 
+  if high_init_abort is not None:
+    high_init_abort.set()
+    high_init_abort = None
+
 
 #
 # This function searches for all lines in the main text widget which match the
 # given pattern and adds the given tag to them.  If the loop doesn't complete
 # within 100ms, the search is paused and the function returns the number of the
 # last searched line.  In this case the caller must invoke the funtion again
-# (as an idle event, to allow user-interaction in-between.)
+# (as an idle event, to allow user-interaction in-between.)  When parameter
+# "do_tag" is False, matching lines are only passed to the search list dialog;
+# the caller then has to take care of tagging the visible text.
+#
+def HighlightLines(pat, tagnam, opt, line, do_tag=True):
+  rx = Highlight_CompileRe(pat, opt)
+  if rx is None:
+    # pattern not supported by Python's reg.exp. engine: use the text widget search
+    return HighlightLines_TkSearch(pat, tagnam, opt, line, do_tag)
+
+  lines = HighlightGetLines()
+  max_line = len(lines)
+  deadline = time.monotonic_ns() + 100000000
+  literal = Highlight_GetLiteral(pat, opt)
+  search = rx.search
+  first_line = line
+  matches = []
+  result = -1
+
+  (text, offsets) = HighlightGetText()
+  find = text.find
+  count = text.count
+  dense = False
+  line_local = Highlight_IsLineLocal(rx)
+
+  while line < max_line:
+    # collect matching lines in portions of 256 lines
+    end = min(line + 256, max_line)
+    start_off = offsets[line - 1]
+    end_off = offsets[end - 1]
+    if literal is not None:
+      cnt = count(literal, start_off, end_off)
+      if (cnt > 0) and (cnt * 8 < end - line):
+        # few matches: search in the complete text and skip to the next line after each match
+        pos = find(literal, start_off, end_off)
+        while pos >= 0:
+          lnum = bisect.bisect_right(offsets, pos, line - 1, end)
+          matches.append(lnum)
+          pos = find(literal, offsets[lnum], end_off)
+      elif cnt > 0:
+        matches.extend([lnum for lnum, txt in enumerate(lines[line - 1 : end - 1], line) if literal in txt])
+
+    elif dense or not line_local:
+      # many matches in the previous portion: searching line by line is faster
+      # (also required for patterns which may see neighbouring lines)
+      portion = [lnum for lnum, txt in enumerate(lines[line - 1 : end - 1], line) if search(txt)]
+      matches.extend(portion)
+      dense = (len(portion) * 8 >= end - line)
+
+    else:
+      # search in the complete text and skip to the next line after each match
+      # (the portion ends before the newline of its last line, so "$" matches there only at a line end)
+      portion = []
+      match = search(text, start_off, end_off - 1)
+      while match is not None:
+        lnum = bisect.bisect_right(offsets, match.start(), line - 1, end)
+        # matches spanning multiple lines are verified on the start line alone
+        if (find("\n", match.start(), match.end()) < 0) or search(lines[lnum - 1]):
+          portion.append(lnum)
+        match = search(text, offsets[lnum], end_off - 1)
+      matches.extend(portion)
+      dense = (len(portion) * 8 >= end - line)
+    line = end
+
+    # limit the runtime of the loop - return start line number for the next invocation
+    if (time.monotonic_ns() > deadline) and (line < max_line):
+      result = line
+      break
+
+  if matches:
+    if do_tag:
+      HighlightAddTag(wt.f1_t, tagnam, matches)
+    # trigger the search result list dialog in case lines are included there too
+    SearchList_HighlightLines(tagnam, matches)
+
+  if do_tag:
+    Highlight_AddCovered(Highlight_CoveredKey(pat, tagnam, opt), first_line, line)
+
+  return result
+
+
 #
-def HighlightLines(pat, tagnam, opt, line):
-  max_line = int(wt.f1_t.index("end").split(".")[0])
-  start_t = datetime.now()
-  max_delta = timedelta(microseconds=100000)
+# This function is a variant of the above which uses the search function of
+# the text widget. It is used for patterns that cannot be compiled by Python.
+#
+def HighlightLines_TkSearch(pat, tagnam, opt, line, do_tag=True):
+  end_pos = wt.f1_t.index("end")
+  max_line = int(end_pos[:end_pos.index(".")])
+  deadline = time.monotonic_ns() + 100000000
+  matches = []
+  result = -1
 
   while line < max_line:
     pos = wt.f1_t.search(pat, "%d.0" % line, "end", **opt)
     if pos == "":
       break
 
-    # match found, highlight this line
-    line = int(pos.split(".")[0])
-    wt.f1_t.tag_add(tagnam, "%d.0" % line, "%d.0" % (line + 1))
-    # trigger the search result list dialog in case the line is included there too
-    SearchList_HighlightLine(tagnam, line)
+    # match found, collect this line for highlighting
+    line = int(pos[:pos.index(".")])
+    matches.append(line)
     line += 1
 
     # limit the runtime of the loop - return start line number for the next invocation
-    if (datetime.now() - start_t > max_delta) and (line < max_line):
-      return line
+    if (time.monotonic_ns() > deadline) and (line < max_line):
+      result = line
+      break
 
-  # all done for this pattern
-  return -1
+  if matches:
+    if do_tag:
+      HighlightAddTag(wt.f1_t, tagnam, matches)
+    # trigger the search result list dialog in case lines are included there too
+    SearchList_HighlightLines(tagnam, matches)
+
+  return result
+
+
+#
+# This function adds the given tag to all lines in the given sorted list of
+# line numbers in the given text widget. Runs of consecutive lines are merged
+# into a single range, and all ranges are passed to the widget in one call.
+#
+def HighlightAddTag(wid, tagnam, matches):
+  ranges = []
+  run_start = run_end = matches[0]
+  for line in matches:
+    if line != run_end:
+      ranges.append("%d.0" % run_start)
+      ranges.append("%d.0" % run_end)
+      run_start = line
+    run_end = line + 1
+  ranges.append("%d.0" % run_start)
+  ranges.append("%d.0" % run_end)
+
+  wid.tag_add(tagnam, *ranges)
+
+
+#
+# This function returns True if searching the complete text with the given
+# compiled reg.exp. yields the same matches as searching each line on its own,
+# as done by the text widget. This is not the case for patterns using "\A",
+# "\Z", look-around assertions or inline flags, as these may see or match
+# differently at the neighbouring lines.
+#
+def Highlight_IsLineLocal(rx):
+  global highlight_re_line_only
+
+  return highlight_re_line_only.search(rx.pattern) is None
+
+
+#
+# This function returns a compiled Python reg.exp. for the given pattern and
+# text widget search options, or None if the pattern cannot be compiled. None
+# is also returned for patterns using Tcl reg.exp. syntax which is accepted by
+# Python with a different meaning (e.g. POSIX character classes), so that the
+# caller falls back to searching via the text widget. The result is cached, as
+# highlighting is done for the same patterns repeatedly.
+#
+def Highlight_CompileRe(pat, opt):
+  global highlight_re_cache, highlight_re_tcl_only
+
+  key = (pat, bool(opt.get("regexp")), bool(opt.get("nocase")))
+  rx = highlight_re_cache.get(key, False)
+  if rx is False:
+    if key[1] and highlight_re_tcl_only.search(pat):
+      rx = None
+    else:
+      try:
+        # (multi-line mode allows searching in the complete text; no difference for single lines)
+        rx = re.compile(pat if key[1] else re.escape(pat), re.MULTILINE | (re.IGNORECASE if key[2] else 0))
+      except re.error:
+        rx = None
+
+    # limit the cache size, as search patterns are added too
+    if len(highlight_re_cache) >= 100:
+      highlight_re_cache.clear()
+    highlight_re_cache[key] = rx
+
+  return rx
+
+
+#
+# This function returns the given pattern if it is to be searched as plain
+# sub-string with matching case, else None. For such patterns the sub-string
+# test of Python strings is used, which is faster than a reg.exp. search.
+#
+def Highlight_GetLiteral(pat, opt):
+  if opt.get("regexp") or opt.get("nocase"):
+    return None
+  return pat
+
+
+#
+# This function returns the content of the main text widget as a list of
+# lines, so that highlighting can scan the text without querying the widget
+# for each line. The copy is kept until the content is modified.
+#
+def HighlightGetLines():
+  global highlight_lines, highlight_text
+
+  if highlight_lines is None:
+    # keep the string too, so that it's not re-assembled from the lines (offsets are added on demand)
+    text = wt.f1_t.get("1.0", "end")
+    highlight_lines = text.split("\n")
+    highlight_text = (text, None)
+  return highlight_lines
+
+
+#
+# This function returns the content of the main text widget as a single
+# string, plus a list with the offsets of the start of each line in the
+# string. The line number of a string offset can be determined via bisect.
+# Both are fetched only once and shared by all searches until the content is
+# modified.
+#
+def HighlightGetText():
+  global highlight_text
+
+  lines = HighlightGetLines()
+  if highlight_text[1] is None:
+    offsets = list(itertools.accumulate([len(txt) + 1 for txt in lines], initial=0))
+    highlight_text = (highlight_text[0], offsets)
+  return highlight_text
+
+
+#
+# This function discards the copy of the text content. It must be called
+# whenever text is inserted into or deleted from the main text widget.
+#
+def HighlightDiscardLines():
+  global highlight_lines, highlight_text, highlight_covered, tick_fn_cache, tick_sep_offsets
+
+  highlight_lines = None
+  highlight_text = None
+  highlight_covered = {}
+  # frame numbers are derived from the content too
+  tick_fn_cache = {}
+  tick_sep_offsets = None
+
+
+#
+# This function returns the set of keys (see below) of all current entries in
+# the highlight pattern list. It is used for discarding results of the initial
+# highlighting for patterns which were changed or removed in the meantime.
+#
+def Highlight_PatlistKeys():
+  global patlist
+
+  return {Highlight_CoveredKey(w[0], w[4], Search_GetOptions(w[0], w[1], w[2])) for w in patlist}
+
+
+#
+# This function returns the key for the given pattern in the dict of line
+# ranges which have been completely highlighted.
+#
+def Highlight_CoveredKey(pat, tagnam, opt):
+  return (tagnam, pat, bool(opt.get("regexp")), bool(opt.get("nocase")))
+
+
+#
+# This function records that all matches of a pattern within the given range
+# of lines have been tagged. Overlapping and adjacent ranges are merged.
+#
+def Highlight_AddCovered(key, first, end):
+  global highlight_covered
+
+  ranges = highlight_covered.get(key, [])
+  bisect.insort(ranges, (first, end))
+
+  merged = [ranges[0]]
+  for (first, end) in ranges[1:]:
+    if first <= merged[-1][1]:
+      if end > merged[-1][1]:
+        merged[-1] = (merged[-1][0], end)
+    else:
+      merged.append((first, end))
+
+  highlight_covered[key] = merged
+
+
+#
+# This function returns the sub-ranges of the given range of lines which
+# have not been highlighted completely yet for the given pattern.
+#
+def Highlight_GetUncovered(key, first, end):
+  global highlight_covered
+
+  result = []
+  for (cov_first, cov_end) in highlight_covered.get(key, []):
+    if cov_end <= first:
+      continue
+    if cov_first >= end:
+      break
+    if cov_first > first:
+      result.append((first, cov_first))
+    first = cov_end
+
+  if first < end:
+    result.append((first, end))
+  return result
+
+
+#
+# This function discards the recorded line ranges for all patterns of the
+# given tag. It must be called when the tag is removed from the text.
+#
+def Highlight_DiscardCovered(tagnam):
+  global highlight_covered
+
+  for key in [key for key in highlight_covered if key[0] == tagnam]:
+    del highlight_covered[key]
 
 
 #
@@ -502,44 +987,79 @@ def HighlightAll(pat, tagnam, opt, line=1, loop_cnt=0):
 
 #
 # This function searches the currently visible text content for all lines
-# which contain the given sub-string and marks these lines with the given tag.
+# which match one of the given patterns and marks these lines with the
+# respective tag. The parameter is a list of tuples of pattern, tag name and
+# search options.
 #
-def HighlightVisible(pat, tagnam, opt):
+def HighlightVisible(pats):
   start_pos = wt.f1_t.index("@1,1")
   end_pos = wt.f1_t.index("@%d,%d" % (wt.f1_t.winfo_width() - 1, wt.f1_t.winfo_height() - 1))
-  line = int(start_pos.split(".")[0])
-  max_line = int(end_pos.split(".")[0])
+  first_line = int(start_pos[:start_pos.index(".")])
+  last_line = int(end_pos[:end_pos.index(".")])
   #puts "visible $start_pos...$end_pos: $pat $opt"
 
-  while line < max_line:
-    pos = wt.f1_t.search(pat, "%d.0" % line, "end", **opt)
-    if pos == "":
-      break
-    line = int(pos.split(".")[0])
-    wt.f1_t.tag_add(tagnam, "%d.0" % line, "%d.0" % (line + 1))
-    line += 1
+  lines = HighlightGetLines()
+  end_line = min(last_line + 1, len(lines))
+  for (pat, tagnam, opt) in pats:
+    rx = Highlight_CompileRe(pat, opt)
+    if rx is not None:
+      # skip lines which were already searched for this pattern
+      key = Highlight_CoveredKey(pat, tagnam, opt)
+      literal = Highlight_GetLiteral(pat, opt)
+      search = rx.search
+      matches = []
+      for (first, end) in Highlight_GetUncovered(key, first_line, end_line):
+        if literal is not None:
+          matches.extend([lnum for lnum, txt in enumerate(lines[first - 1 : end - 1], first) if literal in txt])
+        else:
+          matches.extend([lnum for lnum, txt in enumerate(lines[first - 1 : end - 1], first) if search(txt)])
+        Highlight_AddCovered(key, first, end)
+    else:
+      # pattern not supported by Python's reg.exp. engine: use the text widget search
+      # (limited to the visible lines, as this is called for each incremental search)
+      matches = []
+      line = first_line
+      while line <= last_line:
+        pos = wt.f1_t.search(pat, "%d.0" % line, "%d.0" % (last_line + 1), **opt)
+        if pos == "":
+          break
+        line = int(pos[:pos.index(".")])
+        matches.append(line)
+        line += 1
+
+    if matches:
+      HighlightAddTag(wt.f1_t, tagnam, matches)
 
 
 #
 # This callback is installed to the main text widget's yview. It is used
 # to detect changes in the view to update highlighting if the highlighting
-# task is not complete yet. The event is forwarded to the vertical scrollbar.
+# task is not complete yet, or if search highlighting is enabled (as search
+# matches are tagged only in the visible area). The event is forwarded to the
+# vertical scrollbar.
 #
 def Highlight_YviewCallback(frac1, frac2):
-  global tid_high_init, tid_search_hall
-
-  if tid_high_init is not None:
+  global tid_high_init, tid_search_hall, tlb_cur_hall_opt, high_init_pats
+
+  pats = []
+  if high_init_pats is not None:
+    # use the search options which were determined once when starting the highlighting
+    # (skipping patterns which were changed or removed meanwhile)
+    active = Highlight_PatlistKeys()
+    pats.extend([w for w in high_init_pats if Highlight_CoveredKey(*w) in active])
+  elif tid_high_init is not None:
     global patlist
     for w in patlist:
-      opt = Search_GetOptions(w[0], w[1], w[2])
-      HighlightVisible(w[0], w[4], opt)
+      pats.append((w[0], w[4], Search_GetOptions(w[0], w[1], w[2])))
 
-  if tid_search_hall is not None:
-    global tlb_cur_hall_opt
-    HighlightVisible(tlb_cur_hall_opt[0], "find", tlb_cur_hall_opt[1])
+  if tlb_cur_hall_opt[0] != "":
+    pats.append((tlb_cur_hall_opt[0], "find", tlb_cur_hall_opt[1]))
+
+  if pats:
+    HighlightVisible(pats)
 
   # automatically remove the redirect if no longer needed
-  if (tid_high_init is None) and (tid_search_hall is None):
+  if (tid_high_init is None) and (tlb_cur_hall_opt[0] == ""):
     wt.f1_t.configure(yscrollcommand=wt.f1_sb.set)
 
   wt.f1_sb.set(frac1, frac2)
@@ -561,45 +1081,23 @@ def Highlight_YviewRedirect():
 # sample text widget.)
 #
 def HighlightConfigure(wid, tagname, w):
-  global font_content
-
-  cfg = {}
-  if w[8]:
-    cfg["font"] = DeriveFont(font_content, 0, "bold")
-  else:
-    cfg["font"] = ""
+  global font_content, font_content_bold
 
-  if w[9]:
-    cfg["underline"] = w[9]
-  else:
-    cfg["underline"] = ""
-
-  if w[10]:
-    cfg["overstrike"] = w[10]
-  else:
-    cfg["overstrike"] = ""
-
-  if w[13] != "":
-    cfg["relief"] = w[13]
-    cfg["borderwidth"] = w[14]
-  else:
-    cfg["relief"] = ""
-    cfg["borderwidth"] = ""
-
-  if w[15] > 0:
-    cfg["spacing1"] = w[15]
-    cfg["spacing3"] = w[15]
-  else:
-    cfg["spacing1"] = ""
-    cfg["spacing3"] = ""
-
-  cfg["background"] = w[6]
-  cfg["foreground"] = w[7]
-
-  cfg["bgstipple"] = w[11]
-  cfg["fgstipple"] = w[12]
+  if w[8] and (font_content_bold is None):
+    font_content_bold = DeriveFont(font_content, 0, "bold")
 
-  wid.tag_config(tagname, **cfg)
+  wid.tag_config(tagname,
+                 font=(font_content_bold if w[8] else ""),
+                 underline=(w[9] if w[9] else ""),
+                 overstrike=(w[10] if w[10] else ""),
+                 relief=w[13],
+                 borderwidth=(w[14] if w[13] != "" else ""),
+                 spacing1=(w[15] if w[15] > 0 else ""),
+                 spacing3=(w[15] if w[15] > 0 else ""),
+                 background=w[6],
+                 foreground=w[7],
+                 bgstipple=w[11],
+                 fgstipple=w[12])
 
 
 #
@@ -616,6 +1114,7 @@ def SearchHighlightClear():
 
   wt.f1_t.tag_remove("find", "1.0", "end")
   wt.f1_t.tag_remove("findinc", "1.0", "end")
+  Highlight_DiscardCovered("find")
   tlb_cur_hall_opt = ["", []]
 
   SearchList_HighlightClear()
@@ -651,12 +1150,12 @@ def SearchHighlightUpdate(pat, opt):
 
           # apply highlighting on the text in the visible area (this is quick)
           # (note this is required in addition to the redirect below)
-          HighlightVisible(pat, "find", opt)
+          HighlightVisible([(pat, "find", opt)])
 
           # use the yview callback to redo highlighting in case the user scrolls
           Highlight_YviewRedirect()
       else:
-        HighlightVisible(pat, "find", opt)
+        HighlightVisible([(pat, "find", opt)])
     else:
       SearchHighlightClear()
 
@@ -678,7 +1177,9 @@ def SearchHighlightUpdateCurrent():
 
 #
 # This helper function calls the global search highlight function until
-# highlighting is complete.
+# highlighting is complete. Note matching lines are tagged only in the visible
+# area (via the yview callback), as many tags slow down the text widget; the
+# background search only forwards all matches to the search list dialog.
 #
 def SearchHighlightAll(pat, tagnam, opt, line=1, loop_cnt=0):
   global tid_search_hall, block_bg_tasks
@@ -690,7 +1191,7 @@ def SearchHighlightAll(pat, tagnam, opt, line=1, loop_cnt=0):
     # insert a small timer delay to allow for idle-driven interactive tasks (e.g. selections)
     tid_search_hall = tk.after(10, lambda: SearchHighlightAll(pat, tagnam, opt, line, 0))
   else:
-    line = HighlightLines(pat, tagnam, opt, line)
+    line = HighlightLines(pat, tagnam, opt, line, False)
     if line >= 0:
       loop_cnt += 1
       tid_search_hall = tk.after_idle(lambda: SearchHighlightAll(pat, tagnam, opt, line, loop_cnt))
@@ -734,17 +1235,25 @@ def SearchHighlightToggleVar(obj):
 
 #
 # This function is invoked when the user enters text in the "find" entry field.
-# In contrary to the "atomic" search, this function only searches a small chunk
-# of text, then re-schedules itself as an "idle" task.  The search can be aborted
-# at any time by canceling the task.
-#
-def Search_Background(pat, is_fwd, opt, start, is_changed, callback):
+# In contrary to the "atomic" search, this function searches in a background
+# thread, whose result is polled via timer. (For patterns which cannot be
+# compiled by Python, only a small chunk of text is searched via the text
+# widget, then the function re-schedules itself as an "idle" task.)  The search
+# can be aborted at any time by canceling the task. Additionally, when an
+# epoch number is given, the search stops when the search text was modified
+# in the meantime.
+#
+def Search_Background(pat, is_fwd, opt, start, is_changed, callback, epoch=None):
   global block_bg_tasks, tid_search_inc, tid_search_list
-  global tid_search_inc
+  global tid_search_inc, tlb_inc_epoch, search_inc_abort
+
+  if (epoch is not None) and (epoch != tlb_inc_epoch):
+    # obsolete search: the search text was modified after the search was started
+    return
 
   if block_bg_tasks:
     # background tasks are suspended - re-schedule with timer
-    tid_search_inc = tk.after(100, lambda: Search_Background(pat, is_fwd, opt, start, is_changed, callback))
+    tid_search_inc = tk.after(100, lambda: Search_Background(pat, is_fwd, opt, start, is_changed, callback, epoch))
     return
 
   if is_fwd:
@@ -753,17 +1262,33 @@ def Search_Background(pat, is_fwd, opt, start, is_changed, callback):
     end = "1.0"
 
   if start != end:
+    rx = Search_CompileRe(pat, opt)
+    if rx is not None:
+      # search in the copy of the text in a background thread; the result is polled by timer
+      (text, offsets) = HighlightGetText()
+      start_off = Search_IndexToOffset(start, offsets)
+      end_off = Search_IndexToOffset(end, offsets)
+      literal = Highlight_GetLiteral(pat, opt)
+      results = queue.Queue()
+      abort = threading.Event()
+      search_inc_abort = abort
+
+      threading.Thread(target=lambda: Search_BgLoop(rx, literal, text, offsets, start_off, end_off, results, abort),
+                       daemon=True).start()
+      tid_search_inc = tk.after(10, lambda: Search_BgResult(pat, is_fwd, opt, is_changed, callback, epoch, offsets, results))
+      return
+
     if is_fwd:
       next = wt.f1_t.index(start + " + 5000 lines lineend")
     else:
       next = wt.f1_t.index(start + " - 5000 lines linestart")
 
     # invoke the actual search in the text widget content
-    match_len = IntVar(tk, 0)
+    match_len = search_match_len
     pos = wt.f1_t.search(pat, start, next, count=match_len, **opt)
 
     if pos == "":
-      tid_search_inc = tk.after_idle(lambda: Search_Background(pat, is_fwd, opt, next, is_changed, callback))
+      tid_search_inc = tk.after_idle(lambda: Search_Background(pat, is_fwd, opt, next, is_changed, callback, epoch))
     else:
       tid_search_inc = None
       Search_HandleMatch(pos, match_len.get(), pat, opt, is_changed)
@@ -775,6 +1300,247 @@ def Search_Background(pat, is_fwd, opt, start, is_changed, callback):
     callback("", pat, is_fwd, is_changed)
 
 
+#
+# This function is executed by a background thread started by the above
+# function. It searches the given copy of the text in chunks of 5000 lines,
+# so that it can be aborted in-between, and passes the match offset and
+# length (or -1 if there is no match) to the main thread via the given queue.
+# Note this function must not access any Tk objects.
+#
+def Search_BgLoop(rx, literal, text, offsets, start_off, end_off, results, abort):
+  is_fwd = (start_off <= end_off)
+  line = bisect.bisect_right(offsets, start_off)
+
+  while not abort.is_set():
+    if is_fwd:
+      line = min(line + 5000, len(offsets) - 1)
+      next_off = min(offsets[line] - 1, end_off)
+    else:
+      line = max(line - 5000, 1)
+      next_off = max(offsets[line - 1], end_off)
+
+    (match_off, match_len) = Search_FindOffset(rx, literal, text, offsets, start_off, next_off)
+    if (match_off >= 0) or (next_off == end_off):
+      results.put((match_off, match_len))
+      break
+
+    start_off = next_off
+
+
+#
+# This function is a slave-function of Search_Background. It is invoked via
+# timer to poll for the result of the background thread and then moves the
+# cursor to the match and invokes the given callback.
+#
+def Search_BgResult(pat, is_fwd, opt, is_changed, callback, epoch, offsets, results):
+  global block_bg_tasks, tid_search_inc, tlb_inc_epoch, search_inc_abort
+
+  if (epoch is not None) and (epoch != tlb_inc_epoch):
+    # obsolete search: the search text was modified after the search was started
+    return
+
+  if block_bg_tasks or results.empty():
+    tid_search_inc = tk.after((100 if block_bg_tasks else 10),
+                              lambda: Search_BgResult(pat, is_fwd, opt, is_changed, callback, epoch, offsets, results))
+    return
+
+  (match_off, match_len) = results.get_nowait()
+  if match_off >= 0:
+    pos = Search_OffsetToIndex(match_off, offsets)
+  else:
+    pos = ""
+
+  tid_search_inc = None
+  search_inc_abort = None
+  Search_HandleMatch(pos, match_len, pat, opt, is_changed)
+  callback(pos, pat, is_fwd, is_changed)
+
+
+#
+# This function stops an incremental search in progress, if any. The function
+# returns True if a search or a search timer was canceled.
+#
+def Search_BackgroundCancel():
+  global tid_search_inc, search_inc_abort
+
+  if search_inc_abort is not None:
+    search_inc_abort.set()
+    search_inc_abort = None
+
+  if tid_search_inc is not None:
+    tk.after_cancel(tid_search_inc)
+    tid_search_inc = None
+    return True
+
+  return False
+
+
+#
+# This function returns a compiled Python reg.exp. for searching the given
+# pattern, or None if the search has to be done via the text widget. This is
+# the case for patterns which Highlight_CompileRe rejects, and additionally for
+# reg.exp. containing alternatives: Python uses the first alternative which
+# matches, while Tcl uses the longest match, so that the match length differs.
+#
+def Search_CompileRe(pat, opt):
+  if opt.get("regexp") and ("|" in pat):
+    return None
+  return Highlight_CompileRe(pat, opt)
+
+
+#
+# This function searches the main text content for the given pattern between
+# the given start and end text indices (i.e. backwards when the end lies
+# before the start). The search is done using Python's reg.exp. engine on the
+# copy of the text content, which is much faster than searching via the text
+# widget. Returns a tuple with the text index of the first match (or an empty
+# string if there is none) and the match length, or None if the pattern
+# cannot be compiled by Python, in which case the text widget has to be used.
+#
+def Search_FindPos(pat, opt, start, end):
+  rx = Search_CompileRe(pat, opt)
+  if rx is None:
+    return None
+
+  (text, offsets) = HighlightGetText()
+  start_off = Search_IndexToOffset(start, offsets)
+  end_off = Search_IndexToOffset(end, offsets)
+
+  (match_off, match_len) = Search_FindOffset(rx, Highlight_GetLiteral(pat, opt),
+                                             text, offsets, start_off, end_off)
+  if match_off < 0:
+    return ("", 0)
+
+  return (Search_OffsetToIndex(match_off, offsets), match_len)
+
+
+#
+# This function is a slave-function of the above, which searches the given
+# copy of the text between the given offsets for the given compiled reg.exp.
+# (or the given sub-string, if not None). Returns a tuple with the offset of
+# the match (or -1 if there is none) and the match length.  As in the text
+# widget, matches do not span lines.  Backward searches only return matches
+# which end before the start offset.  Note this function
+# is also used by a background thread and thus must not access Tk objects.
+#
+def Search_FindOffset(rx, literal, text, offsets, start_off, end_off):
+  if (literal is None) and not Highlight_IsLineLocal(rx):
+    return Search_FindOffsetByLine(rx, text, offsets, start_off, end_off)
+
+  match_off = -1
+  match_len = 0
+  if start_off <= end_off:
+    if literal is not None:
+      match_off = text.find(literal, start_off, end_off)
+      match_len = len(literal)
+    else:
+      match = rx.search(text, start_off, end_off)
+      while match and (text.find("\n", match.start(), match.end()) >= 0):
+        # the text widget does not match across lines: search again within the
+        # start line alone; if there is no match, continue with the next line
+        line = bisect.bisect_right(offsets, match.start())
+        line_end = min(offsets[line] - 1, end_off)
+        line_match = rx.search(text, match.start(), line_end)
+        if line_match or (offsets[line] >= end_off):
+          match = line_match
+        else:
+          match = rx.search(text, offsets[line], end_off)
+      if match:
+        match_off = match.start()
+        match_len = match.end() - match_off
+
+  elif literal is not None:
+    match_off = text.rfind(literal, end_off, start_off)
+    match_len = len(literal)
+
+  else:
+    # search backwards line by line for the last match preceding the start position
+    line = bisect.bisect_right(offsets, start_off)
+    while (match_off < 0) and (line >= 1) and (offsets[line] > end_off):
+      line_end = offsets[line] - 1
+      match = rx.search(text, max(offsets[line - 1], end_off), line_end)
+      while match and (match.start() < start_off):
+        if match.end() <= start_off:
+          match_off = match.start()
+          match_len = match.end() - match_off
+        if match.start() >= line_end:
+          break
+        match = rx.search(text, match.start() + 1, line_end)
+      line -= 1
+
+  if match_off < 0:
+    match_len = 0
+  return (match_off, match_len)
+
+
+#
+# This function is a variant of the above for patterns which may see beyond
+# the current line when applied to the complete text (e.g. look-around
+# assertions): each line is copied and searched on its own.
+#
+def Search_FindOffsetByLine(rx, text, offsets, start_off, end_off):
+  is_fwd = (start_off <= end_off)
+  line = bisect.bisect_right(offsets, start_off)
+
+  while (line >= 1) and (line < len(offsets)):
+    line_off = offsets[line - 1]
+    if (line_off > end_off) if is_fwd else (offsets[line] <= end_off):
+      break
+    line_txt = text[line_off : offsets[line] - 1]
+
+    if is_fwd:
+      match = rx.search(line_txt, max(start_off - line_off, 0), end_off - line_off)
+      if match:
+        return (line_off + match.start(), match.end() - match.start())
+      line += 1
+
+    else:
+      # search for the last match in the line which ends before the start position
+      match_off = -1
+      match = rx.search(line_txt, max(end_off - line_off, 0))
+      while match and (line_off + match.start() < start_off):
+        if line_off + match.end() <= start_off:
+          match_off = match.start()
+          match_len = match.end() - match_off
+        if match.start() >= len(line_txt):
+          break
+        match = rx.search(line_txt, match.start() + 1)
+      if match_off >= 0:
+        return (line_off + match_off, match_len)
+      line -= 1
+
+  return (-1, 0)
+
+
+#
+# This helper function converts the given offset in the copy of the text
+# content into a text index (note bookmark images are not included in the copy)
+#
+def Search_OffsetToIndex(off, offsets):
+  global mark_list
+
+  line = bisect.bisect_right(offsets, off)
+  char = off - offsets[line - 1]
+  if mark_list.get(line) is not None:
+    char += 1
+  return "%d.%d" % (line, char)
+
+
+#
+# This helper function converts the given numerical text index into an
+# offset in the copy of the text content.
+#
+def Search_IndexToOffset(pos, offsets):
+  global mark_list
+
+  (line, char) = map(int, pos.split("."))
+  if line >= len(offsets):
+    return offsets[-1] - 1
+  if (char > 0) and (mark_list.get(line) is not None):
+    char -= 1
+  return min(offsets[line - 1] + char, offsets[line] - 1)
+
+
 #
 # This function searches the main text content for the expression in the
 # search entry field, starting at the current cursor position. When a match
@@ -796,26 +1562,35 @@ def Search_Atomic(pat, is_re, use_case, is_fwd, is_changed):
     else:
       search_range = [start_pos, "1.0"]
 
-    match_len = IntVar(tk, 0)
+    match_len = 0
 
     if start_pos != search_range[1]:
-      # invoke the actual search in the text widget content
-      while True:
-        pos = wt.f1_t.search(pat, search_range[0], search_range[1], count=match_len, **search_opt)
-
-        # work-around for backwards search:
-        # make sure the matching text is entirely to the left side of the cursor
-        if (pos != "") and SearchOverlapCheck(is_fwd, start_pos, pos, match_len.get()):
-          # match overlaps: search further backwards
-          search_range[0] = pos
-          continue
+      # invoke the actual search in the copy of the text (backward matches never overlap the start)
+      result = Search_FindPos(pat, search_opt, search_range[0], search_range[1])
+      if result is not None:
+        (pos, match_len) = result
+      else:
+        # invoke the actual search in the text widget content
+        tk_match_len = search_match_len
+        (start_line, sep, start_char) = start_pos.partition(".")
+        (start_line, start_char) = (int(start_line), int(start_char))
+        while True:
+          pos = wt.f1_t.search(pat, search_range[0], search_range[1], count=tk_match_len, **search_opt)
+          match_len = tk_match_len.get()
+
+          # work-around for backwards search:
+          # make sure the matching text is entirely to the left side of the cursor
+          if (pos != "") and SearchOverlapCheck(is_fwd, start_line, start_char, pos, match_len):
+            # match overlaps: search further backwards
+            search_range[0] = pos
+            continue
 
-        break
+          break
     else:
       pos = ""
 
     # update cursor position and highlight
-    Search_HandleMatch(pos, match_len.get(), pat, search_opt, is_changed)
+    Search_HandleMatch(pos, match_len, pat, search_opt, is_changed)
 
   else:
     # empty or invalid expression: just remove old highlights
@@ -827,26 +1602,15 @@ def Search_Atomic(pat, is_re, use_case, is_fwd, is_changed):
 #
 # This helper function checks if the match returned for a backwards search
 # overlaps the search start position (e.g. the match is 1 char left of the
-# start pos, but 2 chars long)
+# start pos, but 2 chars long). The start position is passed as numerical
+# line and character index; the match position must be a numerical index
+# as returned by the text widget's search function.
 #
-def SearchOverlapCheck(is_fwd, start_pos, pos, match_len):
+def SearchOverlapCheck(is_fwd, start_line, start_char, pos, match_len):
   if not is_fwd:
-    # convert start position into numerical (e.g. may be "insert")
-    try:
-      (line1, char1) = map(int, start_pos.split("."))
-    except:
-      try:
-        start_pos = wt.f1_t.index(start_pos)
-        (line1, char1) = map(int, start_pos.split("."))
-      except:
-        return False
-
-  try:
-    (line2, char2) = map(int, wt.f1_t.index(pos).split("."))
-    if (line1 == line2) and (char2 + match_len > char1):
+    (line, sep, char) = pos.partition(".")
+    if (int(line) == start_line) and (int(char) + match_len > start_char):
       return True
-  except:
-    return False
 
   return False
 
@@ -861,20 +1625,28 @@ def SearchOverlapCheck(is_fwd, start_pos, pos, match_len):
 def Search_HandleMatch(pos, match_len, pat, opt, is_changed):
   global tlb_find_line, tlb_hall, tlb_cur_hall_opt
 
+  # collect text widget commands in a Tcl script, so that they're applied in one call
+  wid = str(wt.f1_t)
+  script = []
+
   if (pos != "") or is_changed:
     if not tlb_hall.get() or (tlb_cur_hall_opt[0] != pat):
       SearchHighlightClear()
     else:
-      wt.f1_t.tag_remove("findinc", "1.0", "end")
+      script.append("%s tag remove findinc 1.0 end" % wid)
 
   if pos != "":
     tlb_find_line = int(pos.split(".")[0])
-    wt.f1_t.see(pos)
-    wt.f1_t.mark_set("insert", pos)
-    wt.f1_t.tag_add("find", "%d.0" % tlb_find_line, "%d.0" % (tlb_find_line + 1))
+    script.append("%s see %s" % (wid, pos))
+    script.append("%s mark set insert %s" % (wid, pos))
+    script.append("%s tag add find %d.0 %d.0" % (wid, tlb_find_line, tlb_find_line + 1))
     if match_len > 0:
-      wt.f1_t.tag_add("findinc", pos, "%s + %d chars" % (pos, match_len))
+      script.append("%s tag add findinc %s {%s + %d chars}" % (wid, pos, pos, match_len))
 
+  if script:
+    tk.eval("\n".join(script))
+
+  if pos != "":
     SearchList_HighlightLine("find", tlb_find_line)
     SearchList_MatchView(tlb_find_line)
 
@@ -904,10 +1676,21 @@ def Search_HandleNoMatch(pat, is_fwd):
 #
 def SearchVarTrace(name1, name2, op):
   global tid_search_inc
-  global tlb_last_dir
+  global tlb_last_dir, tlb_inc_epoch, tlb_inc_text
+
+  # ignore assignments which do not actually modify the text (e.g. history
+  # browsing or completion resulting in the same text)
+  pat = tlb_find.get()
+  if pat == tlb_inc_text:
+    return
+  tlb_inc_text = pat
 
-  if tid_search_inc is not None: tk.after_cancel(tid_search_inc)
-  tid_search_inc = tk.after(50, lambda: SearchIncrement(tlb_last_dir, 1))
+  # invalidate a search which is still in progress for the previous text
+  tlb_inc_epoch += 1
+
+  # delay the search so that a burst of key presses results in a single search
+  Search_BackgroundCancel()
+  tid_search_inc = tk.after(120, lambda: SearchIncrement(tlb_last_dir, 1))
 
 
 #
@@ -917,7 +1700,7 @@ def SearchVarTrace(name1, name2, op):
 #
 def SearchIncrement(is_fwd, is_changed):
   global tlb_find, tlb_regexp, tlb_case, tlb_last_dir, tlb_inc_base, tlb_inc_view
-  global tid_search_inc
+  global tid_search_inc, tlb_inc_epoch, tlb_inc_last
 
   tid_search_inc = None
 
@@ -929,20 +1712,37 @@ def SearchIncrement(is_fwd, is_changed):
         tlb_inc_view = [wt.f1_t.xview()[0], wt.f1_t.yview()[0]]
         CursorJumpPushPos(wt.f1_t)
 
+      opt = Search_GetOptions(pat, tlb_regexp.get(), tlb_case.get(), is_fwd)
+
       if is_changed:
         wt.f1_t.tag_remove("findinc", "1.0", "end")
         wt.f1_t.tag_remove("find", "1.0", "end")
+        Highlight_DiscardCovered("find")
         start_pos = tlb_inc_base
         #wt.f1_t.xview_moveto(tlb_inc_view[0])
         #wt.f1_t.yview_moveto(tlb_inc_view[1])
         #wt.f1_t.mark_set("insert", tlb_inc_base)
         #wt.f1_t.see("insert")
+
+        # a sub-string which extends the previous one cannot match where the previous
+        # one did not: skip the search if there was no match, else continue forward
+        # searches at the previous match
+        end_pos = wt.f1_t.index("end")
+        if (    (tlb_inc_last is not None) and (tlb_inc_last[4] is not None)
+            and not opt.get("regexp") and (tlb_inc_last[1] == opt)
+            and (tlb_inc_last[2] == tlb_inc_base) and (tlb_inc_last[3] == end_pos)
+            and pat.startswith(tlb_inc_last[0]) ):
+          if tlb_inc_last[4] == "":
+            start_pos = end_pos if is_fwd else "1.0"
+          elif is_fwd:
+            start_pos = tlb_inc_last[4]
+
+        tlb_inc_last = [pat, opt, tlb_inc_base, end_pos, None]
       else:
         start_pos = Search_GetBase(is_fwd, False)
+        tlb_inc_last = None
 
-      opt = Search_GetOptions(pat, tlb_regexp.get(), tlb_case.get(), is_fwd)
-
-      Search_Background(pat, is_fwd, opt, start_pos, is_changed, Search_IncMatch)
+      Search_Background(pat, is_fwd, opt, start_pos, is_changed, Search_IncMatch, tlb_inc_epoch)
 
     else:
       SearchReset()
@@ -960,6 +1760,10 @@ def SearchIncrement(is_fwd, is_changed):
 #
 def Search_IncMatch(pos, pat, is_fwd, is_changed):
   global tlb_inc_base, tlb_inc_view, tlb_history, tlb_hist_pos, tlb_hist_prefix
+  global tlb_inc_last
+
+  if is_changed and (tlb_inc_last is not None) and (tlb_inc_last[0] == pat):
+    tlb_inc_last[4] = pos
 
   if (pos == "") and (tlb_inc_base is not None):
     if is_changed:
@@ -987,7 +1791,11 @@ def Search_IncMatch(pos, pat, is_fwd, is_changed):
 #
 def SearchExprCheck(pat, is_re, display):
   if is_re:
+    # the compiled expression cache is used, as the check is repeated for each key press
+    if Highlight_CompileRe(pat, {"regexp": 1}) is not None:
+      return 1
     try:
+      # patterns using Tcl specific syntax are not compiled into the cache
       re.compile(pat)
       return 1
     except re.error as e:
@@ -1046,12 +1854,14 @@ def Search_GetBase(is_fwd, is_init):
 
 #
 # This function translates user-options into search options for the text widget.
+# Note reg.exp. mode is used only if the pattern contains special characters,
+# as sub-string searches are much faster.
 #
 def Search_GetOptions(pat, is_re, use_case, is_fwd=-1):
 
   search_opt = {}
   if is_re:
-    if re.search(r"[\.\\\*\+\?\(\[\{\^\$]", pat):
+    if search_re_special.search(pat):
       search_opt["regexp"] = 1
 
   if use_case == 0:
@@ -1117,12 +1927,7 @@ def SearchAll(raise_win, direction):
 
       # note more clean-up is triggered via the focus-out event
       wt.f1_t.focus_set()
-
-      if tlb_last_wid is not None:
-        tlb_last_wid.focus_set()
-        # raise the caller's window above the main window
-        top_wid = tlb_last_wid.winfo_toplevel()
-        top_wid.lift()
+      Search_ReturnFocus()
 
     SearchList_Open(raise_win)
     SearchList_SearchMatches(True, pat, is_re, use_case, direction)
@@ -1137,6 +1942,7 @@ def SearchReset():
 
   wt.f1_t.tag_remove("find", "1.0", "end")
   wt.f1_t.tag_remove("findinc", "1.0", "end")
+  Highlight_DiscardCovered("find")
   tlb_cur_hall_opt = ["", []]
 
   if tlb_inc_base is not None:
@@ -1172,7 +1978,7 @@ def SearchInit():
 # Escape keys.
 #
 def SearchEnter(is_fwd, wid=None):
-  global tlb_find, tlb_last_dir, tlb_last_wid
+  global tlb_find, tlb_last_dir, tlb_last_wid, tlb_last_top
 
   tlb_last_dir = is_fwd
   tlb_find.set("")
@@ -1184,8 +1990,26 @@ def SearchEnter(is_fwd, wid=None):
   tlb_last_wid = wid
   if tlb_last_wid is not None:
     # raise the search entry field above the caller's window
-    top_wid = tlb_last_wid.winfo_toplevel()
-    top_wid.lift()
+    # (the toplevel is remembered for raising the caller's window when leaving)
+    tlb_last_top = tlb_last_wid.winfo_toplevel()
+    tlb_last_top.lift()
+  else:
+    tlb_last_top = None
+
+
+#
+# This function returns the keyboard focus to the widget (if any) which was
+# passed when entering the search and raises the caller's window above the
+# main window.
+#
+def Search_ReturnFocus():
+  global tlb_last_wid, tlb_last_top
+
+  if tlb_last_wid is not None:
+    tlb_last_wid.focus_set()
+    if tlb_last_top is None:
+      tlb_last_top = tlb_last_wid.winfo_toplevel()
+    tlb_last_top.lift()
 
 
 #
@@ -1194,13 +2018,11 @@ def SearchEnter(is_fwd, wid=None):
 #
 def SearchLeave():
   global tlb_find, tlb_regexp, tlb_case, tlb_hall
-  global tlb_inc_base, tlb_inc_view, tlb_find_focus, tlb_last_wid
+  global tlb_inc_base, tlb_inc_view, tlb_find_focus, tlb_last_wid, tlb_last_top
   global tlb_hist_pos, tlb_hist_prefix
   global tid_search_inc
 
-  if tid_search_inc is not None:
-    tk.after_cancel(tid_search_inc)
-    tid_search_inc = None
+  Search_BackgroundCancel()
 
   # ignore if the keyboard focus is leaving towards another application
   focus_nam = tk.focus_get()
@@ -1218,6 +2040,7 @@ def SearchLeave():
     tlb_hist_prefix = None
 
     tlb_last_wid = None
+    tlb_last_top = None
     tlb_find_focus = 0
 
 
@@ -1236,12 +2059,7 @@ def SearchAbort():
   SearchReset()
   # note more clean-up is triggered via the focus-out event
   wt.f1_t.focus_set()
-
-  if tlb_last_wid is not None:
-    tk.focus.set(tlb_last_wid)
-
-    top_wid = tlb_last_wid.winfo_toplevel()
-    top_wid.lift()
+  Search_ReturnFocus()
 
 
 #
@@ -1254,12 +2072,7 @@ def SearchReturn():
   global tlb_find, tlb_regexp, tlb_history, tlb_last_dir, tlb_last_wid
   global tid_search_inc
 
-  if tid_search_inc is not None:
-    tk.after_cancel(tid_search_inc)
-    tid_search_inc = None
-    restart = True
-  else:
-    restart = False
+  restart = Search_BackgroundCancel()
 
   if tlb_find.get() == "":
     # empty expression: repeat last search
@@ -1283,11 +2096,7 @@ def SearchReturn():
 
     # note this implicitly triggers the leave event
     wt.f1_t.focus_set()
-    if tlb_last_wid is not None:
-      tlb_last_wid.focus_set()
-      # raise the caller's window above the main window
-      top_wid = tlb_last_wid.winfo_toplevel()
-      top_wid.lift()
+    Search_ReturnFocus()
 
 
 #
@@ -1302,22 +2111,19 @@ def Search_AddHistory(txt, is_re, use_case):
     old_sel = SearchHistory_StoreSel()
 
     # search for the expression in the history (options not compared)
-    idx = 0
-    for hl in tlb_history:
-      if hl[0] == txt: break
-      idx += 1
+    idx = next((idx for idx, hl in enumerate(tlb_history) if hl[0] == txt), None)
 
     # remove the element if already in the list
-    if idx < len(tlb_history):
+    if idx is not None:
       del tlb_history[idx]
 
     # insert the element at the top of the stack
     hl = [txt, is_re, use_case, int(time.time())]
     tlb_history.insert(0, hl)
 
-    # maintain max. stack depth
+    # maintain max. stack depth (the list is modified in place, i.e. not copied)
     if len(tlb_history) > tlb_hist_maxlen:
-      tlb_history = tlb_history[0 : tlb_hist_maxlen - 1]
+      del tlb_history[tlb_hist_maxlen:]
 
     UpdateRcAfterIdle()
 
@@ -1373,13 +2179,11 @@ def Search_BrowseHistory(is_up):
 def Search_HistoryComplete(step):
   global tlb_find, tlb_hist_prefix, tlb_history, tlb_hist_pos, tlb_hist_prefix
 
-  pat = tlb_find.get()
-  pf_len = len(tlb_hist_prefix)
+  prefix = tlb_find.get()[0 : len(tlb_hist_prefix)]
   idx = tlb_hist_pos
 
   while (idx >= 0) and (idx < len(tlb_history)):
-    hl = tlb_history[idx]
-    if hl[0][0:pf_len] == pat[0:pf_len]:
+    if tlb_history[idx][0].startswith(prefix):
       return idx
     idx += step
 
@@ -1400,21 +2204,25 @@ def Search_Complete():
     off = 0
 
     if tlb_regexp.get():
-      if tlb_case.get():
-        opt = re.IGNORECASE
-      else:
-        opt = 0
-
       if SearchExprCheck(tlb_find.get(), tlb_regexp.get(), 1):
-        match = re.match("^" + tlb_find.get(), dump, opt)
-        if match:
-          off = len(match.group(0))
+        # use the compiled expression cache, as this is repeated while the pattern is unchanged
+        opt = Search_GetOptions(tlb_find.get(), tlb_regexp.get(), tlb_case.get())
+        rx = Search_CompileRe(tlb_find.get(), opt)
+        if rx is not None:
+          match = rx.match(dump)
+          if match:
+            off = len(match.group(0))
+        else:
+          # pattern is not supported by Python: match via the text widget
+          match_pos = wt.f1_t.search(tlb_find.get(), pos, pos + " lineend", count=search_match_len, **opt)
+          if match_pos == pos:
+            off = search_match_len.get()
       else:
         return
     else:
       off = len(tlb_find.get())
 
-    match = re.match(r"^(?:\W+|\w+)", dump[off :])
+    match = search_re_word_right.match(dump[off :])
     if match:
       word = Search_EscapeSpecialChars(match.group(0), tlb_regexp.get())
       tlb_find.set(tlb_find.get() + word)
@@ -1436,7 +2244,7 @@ def Search_CompleteLeft():
   if pos != "":
     dump = ExtractText(pos + " linestart", pos)
 
-    match = re.search(r"(?:\W+|\w+)$", dump)
+    match = search_re_word_left.search(dump)
     if match:
       word = Search_EscapeSpecialChars(match.group(0), tlb_regexp.get())
       tlb_find.set(word + tlb_find.get())
@@ -1458,12 +2266,12 @@ def SearchWord(is_fwd):
   if pos != "":
     # extract word to the right starting at the cursor position
     dump = ExtractText(pos, pos + " lineend")
-    match = re.match(r"^[\w\-]+", dump)
+    match = search_re_ident_right.match(dump)
     if match:
       word = match.group(0)
       # complete word to the left
       dump = ExtractText(pos + " linestart", pos)
-      match = re.search(r"[\w\-]+$", dump)
+      match = search_re_ident_left.search(dump)
       if match:
         word = match.group(0) + word
 
@@ -1488,7 +2296,7 @@ def SearchWord(is_fwd):
 # character in the current line.
 #
 def SearchCharInLine(char, dir):
-  global last_inline_char, last_inline_dir
+  global last_inline_char, last_inline_dir, mark_list
 
   ClearStatusLine("search_inline")
   if char != "":
@@ -1504,19 +2312,25 @@ def SearchCharInLine(char, dir):
 
   pos = wt.f1_t.index("insert")
   if pos != "":
+    # search in the copy of the text content, which is kept across invocations
+    # (note bookmark images are not included in the copy)
+    (line, char_idx) = map(int, pos.split("."))
+    lines = HighlightGetLines()
+    dump = lines[line - 1] if line <= len(lines) else ""
+    img_off = 1 if (mark_list.get(line) is not None) else 0
+    char_idx = max(char_idx - img_off, 0)
+
     if dir > 0:
-      dump = ExtractText(pos, pos + " lineend")
-      idx = dump.find(char)
+      idx = dump.find(char, char_idx)
       if idx != -1:
-        wt.f1_t.mark_set("insert", "insert + %s chars" % idx)
+        wt.f1_t.mark_set("insert", "%d.%d" % (line, idx + img_off))
         wt.f1_t.see("insert")
       else:
         DisplayStatusLine("search_inline", "warn", "Character \"%s\" not found until line end" % char)
     else:
-      dump = ExtractText(pos + " linestart", pos)
-      idx = dump.rfind(char)
+      idx = dump.rfind(char, 0, char_idx)
       if idx != -1:
-        wt.f1_t.mark_set("insert", "insert - %s chars" % (len(dump) - idx))
+        wt.f1_t.mark_set("insert", "%d.%d" % (line, idx + img_off))
         wt.f1_t.see("insert")
       else:
         DisplayStatusLine("search_inline", "warn", "Character \"%s\" not found until line start" % char)
@@ -1701,11 +2515,16 @@ def ChangeFontSize(delta):
 # This function is called after a new fonct has been configured to apply
 # the new font in the main window, text highlight tags and dialog texts.
 # The function returns 1 on success and saves the font setting in the RC.
+# Nothing is done when the font is unchanged since it was last applied.
 #
 def ApplyFont():
-  global font_content
+  global font_content, font_content_bold, font_content_linespace, font_content_applied
 
   cerr = None
+  new_font = font_content.actual()
+  if new_font == font_content_applied:
+    return cerr
+
   try:
     wt.f1_t.configure(font=font_content)
 
@@ -1723,15 +2542,46 @@ def ApplyFont():
       wt.dlg_tags_f1_l.configure(font=font_content)
 
     # update font in highlight tags (in case some contain font modifiers)
+    font_content_bold = None
+    font_content_linespace = None
     HighlightCreateTags()
     SearchList_CreateHighlightTags()
     MarkList_CreateHighlightTags()
+
+    font_content_applied = new_font
   except Exception as e:
     cerr = "Failed to configure font:" + str(e)
 
   return cerr
 
 
+#
+# This function returns the line height of the content font in pixels. The
+# value is queried from Tk upon first use and cached until the font changes.
+#
+def GetContentLinespace():
+  global font_content, font_content_linespace
+
+  if font_content_linespace is None:
+    font_content_linespace = font_content.metrics("linespace")
+  return font_content_linespace
+
+
+#
+# This function returns the width and height of the given widget in pixels.
+# The values are cached until the widget is resized, which requires the
+# widget to have the binding installed by KeyBinding_WidgetSize.
+#
+def GetWidgetSize(wid):
+  global win_size_cache
+
+  size = win_size_cache.get(str(wid))
+  if size is None:
+    size = (wid.winfo_width(), wid.winfo_height())
+    win_size_cache[str(wid)] = size
+  return size
+
+
 #
 # This function is bound to ALT-w and toggles wrapping of long lines
 # in the main window.
@@ -1749,13 +2599,11 @@ def ToggleLineWrap():
 # placed at the top, center or bottom of the viewable area, if possible.
 #
 def YviewSet(wid, where, col):
-  global font_content
-
   wid.see("insert")
   pos = wid.bbox("insert")
   if pos is not None:
-    fh = font_content.metrics("linespace")
-    wh = wid.winfo_height()
+    fh = GetContentLinespace()
+    wh = GetWidgetSize(wid)[1]
     bbox_y = pos[1]
     bbox_h = pos[3]
 
@@ -1771,21 +2619,17 @@ def YviewSet(wid, where, col):
     else:
       delta = 0
 
-    if delta > 0:
-      wid.yview_scroll(delta, "units")
-    elif delta < 0:
+    if delta != 0:
       wid.yview_scroll(delta, "units")
 
     if col == 0:
-      wid.xview_moveto(0)
-      wid.mark_set("insert", "insert linestart")
-      CursorMoveLine(wid, 0)
-    else:
+      CursorGotoIndex(wid, "insert linestart", "first")
+    elif delta != 0:
       wid.see("insert")
 
   # synchronize the search result list (if open) with the main text
-  (idx_l, idx_c) = map(int, wt.f1_t.index("insert").split("."))
-  SearchList_MatchView(idx_l)
+  (idx_l, idx_c) = GetIndexLineCol(wt.f1_t, "insert")
+  SearchList_MatchViewDelayed(idx_l)
 
 
 #
@@ -1794,19 +2638,8 @@ def YviewSet(wid, where, col):
 # is placed in the last visible line in scrolling direction.
 #
 def YviewScroll(wid, delta):
-  global font_content
-
-  wid.yview_scroll(delta, "units")
-
-  fh = font_content.metrics("linespace")
-  pos = wid.bbox("insert")
-
-  # check if cursor is fully visible
-  if (pos is None) or (pos[3] < fh):
-    if delta < 0:
-      wid.mark_set("insert", "@1,%d - 1 lines linestart" % wid.winfo_height())
-    else:
-      wid.mark_set("insert", "@1,1")
+  # scroll and check if cursor is still fully visible within a single Tcl procedure
+  wid.tk.call("trowser_yview_scroll", wid, delta, GetContentLinespace())
 
 
 #
@@ -1814,10 +2647,8 @@ def YviewScroll(wid, delta):
 # in the given direction.
 #
 def YviewScrollHalf(wid, dir):
-  global font_content
-
-  wh = wid.winfo_height()
-  fh = font_content.metrics("linespace")
+  wh = GetWidgetSize(wid)[1]
+  fh = GetContentLinespace()
   if fh > 0:
     wh = int((wh + fh/2) / fh)
     YviewScroll(wid, int(wh/2 * dir))
@@ -1833,15 +2664,13 @@ def CursorSetLine(wid, where, off):
     if (off > 0) and not IsRowFullyVisible(wid, index):
       # offset out of range - set to bottom instead
       return CursorSetLine(wid, "bottom", 0)
-    else:
-      wid.mark_set("insert", index)
 
   elif where == "center":
     # note the offset parameter is not applicable in this case
-    wid.mark_set("insert", "@1,%d" % (wid.winfo_height() // 2))
+    index = "@1,%d" % (GetWidgetSize(wid)[1] // 2)
 
   elif where == "bottom":
-    index = wid.index("@1,%d linestart - %d lines" % (wid.winfo_height(), off))
+    index = wid.index("@1,%d linestart - %d lines" % (GetWidgetSize(wid)[1], off))
     if not IsRowFullyVisible(wid, index):
       if off == 0:
         # move cursor to the last fully visible line to avoid scrolling
@@ -1850,12 +2679,11 @@ def CursorSetLine(wid, where, off):
         # offset out of range - set to top instead
         return CursorSetLine(wid, "top", 0)
 
-    wid.mark_set("insert", index)
   else:
-    wid.mark_set("insert", "insert linestart")
+    index = "insert linestart"
 
   # place cursor on first non-blank character in the selected row
-  CursorMoveLine(wid, 0)
+  CursorGotoIndex(wid, index, "first")
 
 
 #
@@ -1863,8 +2691,7 @@ def CursorSetLine(wid, where, off):
 # scrolling if needed to keep the cursor position visible.
 #
 def CursorMoveUpDown(wid, delta):
-  wid.mark_set("insert", "insert + %d lines" % delta)
-  wid.see("insert")
+  CursorGotoIndex(wid, "insert + %d lines" % delta)
 
 #
 # This function moves the cursor by the given number of characters left or
@@ -1872,8 +2699,7 @@ def CursorMoveUpDown(wid, delta):
 # is scrolling if needed to keep the cursor position visible.
 #
 def CursorMoveLeftRight(wid, delta):
-  wid.mark_set("insert", "insert + %d chars" % delta)
-  wid.see("insert")
+  CursorGotoIndex(wid, "insert + %d chars" % delta)
 
 #
 # This function moves the cursor by the given number of lines and places
@@ -1882,19 +2708,25 @@ def CursorMoveLeftRight(wid, delta):
 #
 def CursorMoveLine(wid, delta):
   if delta > 0:
-    wid.mark_set("insert", "insert linestart + %d lines" % delta)
+    index = "insert linestart + %d lines" % delta
   elif delta < 0:
-    wid.mark_set("insert", "insert linestart %d lines" % delta)
+    index = "insert linestart %d lines" % delta
+  else:
+    index = "insert"
 
-  wid.xview_moveto(0)
+  CursorGotoIndex(wid, index, "first")
 
-  # forward to the first non-blank character
-  dump = ExtractText("insert", "insert lineend")
-  spc = len(dump) - len(dump.lstrip())
-  if spc > 0:
-    wid.mark_set("insert", "insert + %d chars" % spc)
 
-  wid.see("insert")
+#
+# This function places the cursor at the given text index and makes it
+# visible. When the mode is "first", the cursor is then forwarded to the first
+# non-blank character in the line (searched within the widget to avoid
+# transferring the text of possibly very long lines); for modes "first" and
+# "left" the view is scrolled to the left border. All steps are done by a
+# single call of a Tcl procedure defined during start-up.
+#
+def CursorGotoIndex(wid, index, mode=""):
+  wid.tk.call("trowser_cursor_goto", wid, index, mode)
 
 
 #
@@ -1904,22 +2736,23 @@ def CursorMoveLine(wid, delta):
 #
 def CursorGotoLine(wid, where):
   CursorJumpPushPos(wt.f1_t)
+  index = "insert"
   if where == "start":
-    wid.mark_set("insert", "1.0")
+    index = "1.0"
   elif where == "end":
-    wid.mark_set("insert", "end -1 lines linestart")
+    index = "end -1 lines linestart"
   else:
     try:
       where_val = int(where)
       if where_val >= 0:
-        wid.mark_set("insert", where + ".0")
+        index = where + ".0"
       else:
-        wt.f1_t.mark_set("insert", "end - %d lines linestart" % (1 - where_val))
+        index = "end - %d lines linestart" % (1 - where_val)
     except:
       pass
 
   # place the cursor on the first character in the line and make it visible
-  CursorMoveLine(wid, 0)
+  CursorGotoIndex(wid, index, "first")
 
 
 #
@@ -1941,7 +2774,7 @@ def XviewScroll(wid, how, delta, dir):
     if (pos_new is None) or (pos_new[2] == 0):
       ycoo = pos_old[1] + pos_old[3] // 2
       if dir < 0:
-        wid.mark_set("insert", "@%d,%d" % (wid.winfo_width(), ycoo))
+        wid.mark_set("insert", "@%d,%d" % (GetWidgetSize(wid)[0], ycoo))
       else:
         wid.mark_set("insert", "@1,%d + 1 chars" % ycoo)
 
@@ -1952,7 +2785,7 @@ def XviewScroll(wid, how, delta, dir):
 #
 def XviewScrollHalf(wid, dir):
   xpos = wid.xview()
-  w = wid.winfo_width()
+  w = GetWidgetSize(wid)[0]
   if w != 0:
     fract_visible = xpos[1] - xpos[0]
     off = xpos[0] + dir * (0.5 * fract_visible)
@@ -1969,7 +2802,7 @@ def XviewScrollHalf(wid, dir):
 def XviewSet(wid, where):
   xpos = wid.xview()
   coo = wid.bbox("insert")
-  w = wid.winfo_width()
+  w = GetWidgetSize(wid)[0]
   if (coo is not None) and (w != 0):
     fract_visible = xpos[1] - xpos[0]
     fract_insert = (2 + coo[0] + coo[2]) / w
@@ -2004,23 +2837,18 @@ def CursorSetColumn(wid, where):
 
 #
 # This function moves the cursor onto the next or previous word.
-# (Same as "w", "b" et.al. in vim)
+# (Same as "w", "b" et.al. in vim)  The view is scrolled to make the new
+# cursor position visible, unless the last parameter is False.
 #
-def CursorMoveWord(is_fwd, spc_only, to_end):
+def CursorMoveWord(is_fwd, spc_only, to_end, do_see=True):
+  global cursor_re_word
+
   pos = wt.f1_t.index("insert")
   if pos != "":
+    pat = cursor_re_word[(bool(is_fwd), bool(spc_only), bool(to_end))]
     if is_fwd:
       dump = ExtractText(pos, pos + " lineend")
-      if spc_only:
-        if to_end:
-          match = re.match("^\s*\S*", dump)
-        else:
-          match = re.match("^\S*\s*", dump)
-      else:
-        if to_end:
-          match = re.match("^\W*\w*", dump)
-        else:
-          match = re.match("^\w*\W*", dump)
+      match = pat.match(dump)
 
       if match and ((len(match.group(0)) < len(dump)) or to_end):
         wt.f1_t.mark_set("insert", "insert + %d chars" % len(match.group(0)))
@@ -2029,23 +2857,15 @@ def CursorMoveWord(is_fwd, spc_only, to_end):
 
     else:
       dump = ExtractText(pos + " linestart", pos)
-      if spc_only:
-        if to_end:
-          match = re.search("\s(\s+)$", dump)
-        else:
-          match = re.search("(\S+\s*)$", dump)
-      else:
-        if to_end:
-          match = re.search("\w(\W+\w*)$", dump)
-        else:
-          match = re.search("(\w+|\w+\W+)$", dump)
+      match = pat.search(dump)
 
       if match:
         wt.f1_t.mark_set("insert", "insert - %d chars" % len(match.group(1)))
       else:
         wt.f1_t.mark_set("insert", "insert - 1 lines lineend")
 
-    wt.f1_t.see("insert")
+    if do_see:
+      wt.f1_t.see("insert")
 
 
 #
@@ -2053,10 +2873,8 @@ def CursorMoveWord(is_fwd, spc_only, to_end):
 # the given window is fully visible.
 #
 def IsRowFullyVisible(wid, index):
-  global font_content
-
-  fh = font_content.metrics("linespace")
-  bbox = wid.bbox("insert")
+  fh = GetContentLinespace()
+  bbox = wid.bbox(index)
 
   if (bbox is None) or (bbox[3] < fh):
     return 0
@@ -2066,44 +2884,44 @@ def IsRowFullyVisible(wid, index):
 
 #
 # Helper function to extrace a range of characters from the content.
+# Note embedded images (i.e. bookmarks) are not included in the result.
 #
 def ExtractText(pos1, pos2):
-  dump = []
-  for (key, val, idx) in wt.f1_t.dump(pos1, pos2, text=1):
-    if key == "text":
-      dump.append(val)
+  return wt.f1_t.get(pos1, pos2)
+
 
-  return ''.join(dump)
+#
+# Helper function which returns the line and column numbers of the given text
+# index (i.e. in the format "line.char") in the given text widget.
+#
+def GetIndexLineCol(wid, index):
+  (line, sep, char) = wid.index(index).partition(".")
+  return (int(line), int(char))
 
 
 #
 # This function is called by all key bindings which make a large jump to
 # push the current cusor position onto the jump stack. Both row and column
 # are stored.  If the position is already on the stack, this entry is
-# deleted (note for this comparison only the line number is considered.)
+# deleted (note for this comparison only the line number is considered,
+# which is the key in the ordered dict holding the stack.)
 #
 def CursorJumpPushPos(wid):
   global cur_jump_stack, cur_jump_idx
 
   if wid == wt.f1_t:
-    cur_pos = wt.f1_t.index("insert")
-    line = int(cur_pos.split(".")[0])
+    (line, char) = GetIndexLineCol(wt.f1_t, "insert")
+    cur_pos = "%d.%d" % (line, char)
     # remove the line if already on the stack
-    idx = 0
-    for pos in cur_jump_stack:
-      prev_line = int(pos.split(".")[0])
-      if prev_line == line:
-        del cur_jump_stack[idx]
-        break
-      idx += 1
+    cur_jump_stack.pop(line, None)
 
     # append to the stack
-    cur_jump_stack.append(cur_pos)
+    cur_jump_stack[line] = cur_pos
     cur_jump_idx = -1
 
-    # limit size of the stack
+    # limit size of the stack by removing the oldest entry
     if len(cur_jump_stack) > 100:
-      del cur_jump_stack[-1]
+      cur_jump_stack.popitem(last=False)
 
 
 #
@@ -2123,7 +2941,7 @@ def CursorJumpToggle(wid):
 
     if len(cur_jump_stack) > 1:
       cur_jump_idx = len(cur_jump_stack) - 2
-      pos = cur_jump_stack[cur_jump_idx]
+      (line, pos) = list(cur_jump_stack.items())[cur_jump_idx]
 
       # FIXME this moves the cursor the the first char instead of the stored position
       try:
@@ -2131,8 +2949,7 @@ def CursorJumpToggle(wid):
       except:
         pass
       CursorMoveLine(wid, 0)
-      line = int(pos.split(".")[0])
-      SearchList_MatchView(line)
+      SearchList_MatchViewDelayed(line)
     else:
       DisplayStatusLine("keycmd", "warn", "Already on the mark.")
   else:
@@ -2166,15 +2983,13 @@ def CursorJumpHistory(wid, rel):
         DisplayStatusLine("keycmd", "warn", "Jump stack wrapped from newest to oldest.")
         cur_jump_idx = 0
 
-    pos = cur_jump_stack[cur_jump_idx]
+    (line, pos) = list(cur_jump_stack.items())[cur_jump_idx]
     try:
       wid.mark_set("insert", pos)
     except:
       pass
     CursorMoveLine(wid, 0)
-
-    line = int(pos.split(".")[0])
-    SearchList_MatchView(line)
+    SearchList_MatchViewDelayed(line)
 
   else:
     DisplayStatusLine("keycmd", "error", "Jump stack is empty.")
@@ -2201,52 +3016,17 @@ def KeyCmdBind(wid, char, cmd):
 # keys which can be part of sequences (e.g. "b" due to "zb")
 #
 def KeyCmd(wid, char):
-  global last_key_char
+  global last_key_char, key_cmd_prefix
 
   reg = key_cmd_reg.get(wid)
   if reg is None: return
 
   result = 0
   if char != "":
-    if last_key_char == "'":
-      # single quote char: jump to marker or bookmark
-      ClearStatusLine("keycmd")
-      if char == "'":
-        CursorJumpToggle(wid)
-      elif char == "^":
-        # '^ and '$ are from less
-        CursorGotoLine(wid, "start")
-      elif char == "$":
-        CursorGotoLine(wid, "end")
-      elif char == "+":
-        Mark_JumpNext(1)
-      elif char == "-":
-        Mark_JumpNext(0)
-      else:
-        DisplayStatusLine("keycmd", "error", "Undefined key sequence \"'%s\"" % char)
-
-      last_key_char = ""
-      result = 1
-
-    elif (last_key_char == "z") or (last_key_char == "g"):
-      ClearStatusLine("keycmd")
-      char = last_key_char + char
-      cb = reg.get(char)
-      if cb is not None:
-        cb()
-      else:
-        DisplayStatusLine("keycmd", "error", "Undefined key sequence \"%s\"" % char)
-
-      last_key_char = ""
-      result = 1
-
-    elif last_key_char == "f":
-      SearchCharInLine(char, 1)
-      last_key_char = ""
-      result = 1
-
-    elif last_key_char == "F":
-      SearchCharInLine(char, -1)
+    handler = key_cmd_prefix.get(last_key_char)
+    if handler is not None:
+      # second key of a sequence: dispatch via the handler of the first key
+      handler(wid, reg, char)
       last_key_char = ""
       result = 1
 
@@ -2262,7 +3042,7 @@ def KeyCmd(wid, char):
         last_key_char = ""
         result = 1
 
-      elif char in "z'fFg":
+      elif char in key_cmd_prefix:
         last_key_char = char
         result = 1
 
@@ -2270,6 +3050,43 @@ def KeyCmd(wid, char):
   return result
 
 
+#
+# This function is a slave-function of KeyCmd for handling the key following
+# a single quote char: jump to marker or bookmark
+#
+def KeyCmd_SeqQuote(wid, reg, char):
+  ClearStatusLine("keycmd")
+  if char == "'":
+    CursorJumpToggle(wid)
+  elif char == "^":
+    # '^ and '$ are from less
+    CursorGotoLine(wid, "start")
+  elif char == "$":
+    CursorGotoLine(wid, "end")
+  elif char == "+":
+    Mark_JumpNext(1)
+  elif char == "-":
+    Mark_JumpNext(0)
+  else:
+    DisplayStatusLine("keycmd", "error", "Undefined key sequence \"'%s\"" % char)
+
+
+#
+# This function is a slave-function of KeyCmd for handling the key following
+# "z" or "g": the sequence is looked up in the widget's key bindings.
+#
+def KeyCmd_SeqBinding(wid, reg, char):
+  global last_key_char
+
+  ClearStatusLine("keycmd")
+  char = last_key_char + char
+  cb = reg.get(char)
+  if cb is not None:
+    cb()
+  else:
+    DisplayStatusLine("keycmd", "error", "Undefined key sequence \"%s\"" % char)
+
+
 #
 # This function is called for all explicit key bindings to forget about
 # any previously buffered partial multi-keypress commands.
@@ -2287,6 +3104,8 @@ def KeyHomeEnd(wid, dir):
 # to the given text widget.
 #
 def KeyBinding_UpDown(wid):
+  KeyBinding_WidgetSize(wid)
+
   wid.bind("<Control-Up>", lambda e: BindCallKeyClrBreak(lambda:YviewScroll(e.widget, -1)))
   wid.bind("<Control-Down>", lambda e: BindCallKeyClrBreak(lambda:YviewScroll(e.widget, 1)))
   wid.bind("<Control-f>", lambda e: BindCallKeyClrBreak(lambda:e.widget.event_generate("<Key-Next>")))
@@ -2320,6 +3139,8 @@ def KeyBinding_UpDown(wid):
 # to the given text widget.
 #
 def KeyBinding_LeftRight(wid):
+  KeyBinding_WidgetSize(wid)
+
   wid.bind("<Control-Left>", lambda e: BindCallKeyClrBreak(lambda:XviewScroll(e.widget, "scroll", 1, -1)))
   wid.bind("<Control-Right>", lambda e: BindCallKeyClrBreak(lambda:XviewScroll(e.widget, "scroll", 1, 1)))
 
@@ -2335,6 +3156,14 @@ def KeyBinding_LeftRight(wid):
   KeyCmdBind(wid, "$", lambda:CursorSetColumn(wid, "right"))
 
 
+#
+# This function adds a binding to the given widget which invalidates the
+# cached widget size (used by the scrolling functions) when it's resized.
+#
+def KeyBinding_WidgetSize(wid):
+  wid.bind("<Configure>", lambda e: win_size_cache.pop(str(e.widget), None), add="+")
+
+
 # ----------------------------------------------------------------------------
 #
 # This function opens a tiny "overlay" dialog which allows to enter a line
@@ -2407,12 +3236,16 @@ def KeyCmd_OpenDialog(type, txt=""):
 
   ResumeBgTasks()
 
+#
+# This function is bound to all key presses in the command dialog, which are
+# not bound to a command. It discards printable characters other than digits.
+#
 def KeyCmd_KeyPress(ev):
   if ev.char == "|":
     # work-around: keysym <Key-bar> doesn't work on German keyboard
     KeyCmd_ExecAbsColumn()
     return "break"
-  elif not ev.char.isdigit() and re.match(r"[[:graph:][:space:]]", ev.char):
+  elif (ev.char != "") and not ev.char.isdigit() and (ev.char.isprintable() or ev.char.isspace()):
     return "break"
   else:
     return None
@@ -2467,12 +3300,10 @@ def KeyCmd_ExecCursorUpDown(is_fwd):
 
   ClearStatusLine("keycmd")
   if is_fwd:
-    wt.f1_t.mark_set("insert", "insert linestart + %d lines" % val)
+    CursorGotoIndex(wt.f1_t, "insert linestart + %d lines" % val, "left")
   else:
-    wt.f1_t.mark_set("insert", "insert linestart - %d lines" % val)
+    CursorGotoIndex(wt.f1_t, "insert linestart - %d lines" % val, "left")
 
-  wt.f1_t.xview_moveto(0)
-  wt.f1_t.see("insert")
   KeyCmd_Leave()
 
 
@@ -2512,13 +3343,12 @@ def KeyCmd_ExecAbsColumn():
 
   ClearStatusLine("keycmd")
   # prevent running beyond the end of the line
-  (max_line, max_col) = map(int, wt.f1_t.index("insert lineend").split("."))
+  (max_line, max_col) = GetIndexLineCol(wt.f1_t, "insert lineend")
   if val < max_col:
-    wt.f1_t.mark_set("insert", "insert linestart + %d chars" % val)
+    CursorGotoIndex(wt.f1_t, "insert linestart + %d chars" % val)
   else:
-    wt.f1_t.mark_set("insert", "insert lineend")
+    CursorGotoIndex(wt.f1_t, "insert lineend")
 
-  wt.f1_t.see("insert")
   KeyCmd_Leave()
 
 
@@ -2565,10 +3395,11 @@ def KeyCmd_ExecSearch(is_fwd):
 
 #
 # This function moves the cursor as if the given key had been pressed
-# the number of times specified in the number entry field.
+# the number of times specified in the number entry field.  For keys which
+# move the cursor by characters, the repetition is done in a single step.
 #
 def KeyCmd_ExecCursorMove(key):
-  global keycmd_ent
+  global keycmd_ent, keycmd_char_moves, keycmd_word_moves
 
   # check if the content is a repeat count
   val = 0
@@ -2581,8 +3412,18 @@ def KeyCmd_ExecCursorMove(key):
   if val < 10000:
     ClearStatusLine("keycmd")
     KeyCmd_Leave()
-    for idx in range(val):
-      wt.f1_t.event_generate(key)
+    delta = keycmd_char_moves.get(key)
+    word_opt = keycmd_word_moves.get(key)
+    if word_opt is not None:
+      # make the cursor visible only once, after the last step
+      for idx in range(val):
+        CursorMoveWord(*word_opt, do_see=False)
+      wt.f1_t.see("insert")
+    elif delta is None:
+      for idx in range(val):
+        wt.f1_t.event_generate(key)
+    else:
+      CursorMoveLeftRight(wt.f1_t, delta * val)
   else:
     DisplayStatusLine("keycmd", "error", "Repetition value too large: %d" % val)
 
@@ -2592,83 +3433,94 @@ def KeyCmd_ExecCursorMove(key):
 #
 # This function retrieves the "frame number" (timestamp) to which a given line
 # of text belongs via pattern matching. Two methods for retrieving the number
-# can be used, depending on which patterns are defined.
+# can be used, depending on which patterns are defined. Results are cached
+# per line until the text content changes, as the search list queries the
+# frame number of many lines within the same frames.
 #
-def ParseFrameTickNo(pos, fn_cache=None):
-  global tick_pat_sep, tick_pat_num, tick_str_prefix
+def ParseFrameTickNo(pos):
+  global tick_pat_sep, tick_pat_num, tick_str_prefix, tick_re_no, tick_fn_cache
 
   # query the cache before parsing for the frame number
-  if fn_cache is not None:
-    if fn_cache.get(pos) is not None:
-      # FN of this line is already known
-      return fn_cache[pos]
-    elif fn_cache.get(-1):
-      prev_rslt = fn_cache[-1]
-      line = int(wt.f1_t.index(pos).split(".")[0])
-      if (line >= prev_rslt[0]) and (line < prev_rslt[1]):
-        # line is within the range of the most recently parsed frame
-        fn_cache[pos] = [prev_rslt[2], prev_rslt[3]]
-        return fn_cache[pos]
+  line = GetIndexLineCol(wt.f1_t, pos)[0]
+  prefix = tick_fn_cache.get(line)
+  if prefix is not None:
+    # FN of this line is already known
+    return prefix
+
+  prev_rslt = tick_fn_cache.get(-1)
+  if (prev_rslt is not None) and (line >= prev_rslt[0]) and (line < prev_rslt[1]):
+    # line is within the range of the most recently parsed frame
+    tick_fn_cache[line] = prev_rslt[2]
+    return prev_rslt[2]
+
+  # limit the cache size, as it's filled for every line in the search list
+  if len(tick_fn_cache) >= 10000:
+    tick_fn_cache.clear()
+
+  prefix = ""
 
   # catch Reg-Exp exceptions because patterns are supplied by user
   try:
+    match_len = search_match_len
     if tick_pat_sep != "":
-      # determine frame number by searching forwards and backwards for frame boundaries
-      # marked by a frame separator pattern; then within these boundaries search for FN
-      prefix = ""
-      tick_no = 0
-      pos1 = wt.f1_t.search(tick_pat_sep, pos+" lineend", "1.0", regexp=1, backwards=1)
-      if pos1 != "":
+      # determine frame number by looking up the frame boundaries preceding and
+      # following the line, which are marked by a frame separator pattern; then
+      # within these boundaries search for FN
+      (text, offsets) = HighlightGetText()
+      sep_offs = ParseFrameTick_GetSeparators()
+      lineend_off = offsets[min(line, len(offsets) - 1)] - 1
+      sep_idx = bisect.bisect_left(sep_offs, lineend_off)
+
+      tick_no = "0"
+      if sep_idx > 0:
+        pos1 = Search_OffsetToIndex(sep_offs[sep_idx - 1], offsets)
         dump = ExtractText(pos1, pos1 + " lineend")
-        match = re.match(r"[1-9][0-9]*", dump)
+        match = tick_re_no.match(dump)
         if match:
           tick_no = match.group(0)
       else:
         pos1 = "1.0"
 
-      pos2 = wt.f1_t.search(tick_pat_sep, pos+" lineend", "end", regexp=1, forward=1)
-      if pos2 == "": pos2 = "end"
+      if sep_idx < len(sep_offs):
+        pos2 = Search_OffsetToIndex(sep_offs[sep_idx], offsets)
+      else:
+        pos2 = "end"
 
-      match_len = IntVar(tk, 0)
       pos3 = wt.f1_t.search(tick_pat_num, pos1, pos2, regexp=1, count=match_len)
       fn_off = 0
       if (pos3 == "") and (pos2 == "end"):
         # line frame contains no FN: use last one +1
         pos2 = pos1
-        pos1 = wt.f1_t.search(tick_pat_sep, pos1, "1.0", regexp=1, backwards=1)
+        if sep_idx > 1:
+          pos1 = Search_OffsetToIndex(sep_offs[sep_idx - 2], offsets)
+        else:
+          pos1 = "1.0"
         pos3 = wt.f1_t.search(tick_pat_num, pos1, pos2, regexp=1, count=match_len)
         fn_off = 1
 
       if pos3 != "":
         dump = ExtractText(pos3, "%s + %d chars" % (pos3, match_len.get()))
-        match = re.match(tick_pat_num, dump)
-        if match:
-          prefix = tick_no + " " + match.group(1)
+        fn = ParseFrameTick_MatchNum(dump)
+        if fn is not None:
+          prefix = tick_no + " " + fn
 
-          if fn_cache is not None:
-            # add result to the cache
-            fn_cache[pos] = [tick_no, fn]
+          if fn_off == 0:
             # add a special entry to the cache remembering the extent of the current frame
-            line1 = int(wt.f1_t.index(pos1).split(".")[0])
-            line2 = int(wt.f1_t.index(pos2).split(".")[0])
-            fn_cache[-1] = [line1, line2, tick_no, fn]
+            line1 = GetIndexLineCol(wt.f1_t, pos1)[0]
+            line2 = GetIndexLineCol(wt.f1_t, pos2)[0]
+            tick_fn_cache[-1] = [line1, line2, prefix]
 
     elif tick_pat_num != "":
       # determine frame number by searching backwards for the line holding the FN
-      prefix = ""
       pos3 = wt.f1_t.search(tick_pat_num, pos + " lineend", "1.0", regexp=1, backwards=1, count=match_len)
       if pos3 != "":
         dump = ExtractText(pos3, "%s + %d chars" % (pos3, match_len.get()))
-        match = re.match(tick_pat_num, dump)
-        if match:
-          prefix = match.group(1)
-
-          if fn_cache is not None:
-            fn_cache[pos] = [tick_no, fn]
+        fn = ParseFrameTick_MatchNum(dump)
+        if fn is not None:
+          prefix = fn
 
-    else:
-      # FN parsing is disabled: omit the prefix
-      prefix = ""
+    # add result to the cache (note FN parsing is disabled when both patterns are empty)
+    tick_fn_cache[line] = prefix
 
   except re.error as e:
     print("Warning: tick pattern match error: " + e.msg, file=sys.stderr)
@@ -2676,6 +3528,71 @@ def ParseFrameTickNo(pos, fn_cache=None):
   return prefix
 
 
+#
+# This function returns a sorted list with the offsets of all matches of the
+# frame separator pattern in the copy of the text content. The list is built
+# upon first use and kept until the content changes, so that the frame
+# boundaries around a given line can be determined via bisect.
+#
+def ParseFrameTick_GetSeparators():
+  global tick_pat_sep, tick_sep_offsets
+
+  if tick_sep_offsets is None:
+    (text, offsets) = HighlightGetText()
+    rx = Highlight_CompileRe(tick_pat_sep, {"regexp": 1})
+    if (rx is not None) and Highlight_IsLineLocal(rx):
+      # search in the complete text in a single pass, instead of line by line
+      sep_offs = []
+      match = rx.search(text)
+      while match is not None:
+        if text.find("\n", match.start(), match.end()) < 0:
+          sep_offs.append(match.start())
+          pos = max(match.end(), match.start() + 1)
+        else:
+          # matches spanning multiple lines are searched again within the start line alone
+          line = bisect.bisect_right(offsets, match.start())
+          sep_offs.extend([m.start() for m in rx.finditer(text, match.start(), offsets[line] - 1)])
+          pos = offsets[line]
+        match = rx.search(text, pos)
+      tick_sep_offsets = sep_offs
+    elif rx is not None:
+      # patterns which may see neighbouring lines are searched line by line
+      lines = HighlightGetLines()
+      tick_sep_offsets = [line_off + m.start() for (line_off, txt) in zip(offsets, lines) for m in rx.finditer(txt)]
+    else:
+      # pattern cannot be compiled by Python: collect matches via the text widget
+      sep_offs = []
+      pos = wt.f1_t.search(tick_pat_sep, "1.0", "end", regexp=1)
+      while pos != "":
+        sep_offs.append(Search_IndexToOffset(pos, offsets))
+        pos = wt.f1_t.search(tick_pat_sep, pos + " + 1 chars", "end", regexp=1)
+      tick_sep_offsets = sep_offs
+
+  return tick_sep_offsets
+
+
+#
+# This function extracts the frame number from the given text matched by the
+# frame number pattern, i.e. the first sub-match, or returns None. The
+# compiled expression is cached, as the pattern is applied for every line in
+# the search list. Patterns which are not supported by Python are applied via
+# Tcl's regexp command (i.e. the same engine which found the text.)
+#
+def ParseFrameTick_MatchNum(dump):
+  global tick_pat_num
+
+  rx = Highlight_CompileRe(tick_pat_num, {"regexp": 1})
+  if rx is not None:
+    match = rx.match(dump)
+    if match:
+      return match.group(1)
+  else:
+    match = tk.splitlist(tk.call("regexp", "-inline", "--", tick_pat_num, dump))
+    if len(match) >= 2:
+      return match[1]
+  return None
+
+
 #
 # This function adds or removes a bookmark at the given text line.
 # The line is marked by inserting an image in the text and the bookmark
@@ -3108,9 +4025,7 @@ def MarkList_SelectionChange(sel):
     SearchList_MatchView(line)
 
   if len(sel) > 1:
-    for idx in sel[1:]:
-      line = dlg_mark_list[idx]
-      wt.f1_t.tag_add("find", "%d.0" % line, "%d.0" % (line + 1))
+    HighlightAddTag(wt.f1_t, "find", [dlg_mark_list[idx] for idx in sel[1:]])
 
 
 #
@@ -3698,7 +4613,7 @@ def SearchHistory_GetLen():
 #
 def SearchList_Open(raise_win):
   global font_content, col_bg_content, col_fg_content, cur_filename
-  global dlg_srch_shown, dlg_srch_geom, dlg_srch_sel, dlg_srch_lines, dlg_srch_fn_cache
+  global dlg_srch_shown, dlg_srch_geom, dlg_srch_sel, dlg_srch_lines
   global dlg_srch_show_fn, dlg_srch_show_tick, dlg_srch_tick_delta, dlg_srch_tick_root
   global dlg_srch_highlight, dlg_srch_undo, dlg_srch_redo
 
@@ -3825,7 +4740,7 @@ def SearchList_Open(raise_win):
 # The function stops background processes and releases all dialog resources.
 #
 def SearchList_Close():
-  global dlg_srch_sel, dlg_srch_lines, dlg_srch_fn_cache, dlg_srch_shown
+  global dlg_srch_sel, dlg_srch_lines, dlg_srch_shown
 
   SearchList_SearchAbort(0)
 
@@ -3834,7 +4749,6 @@ def SearchList_Close():
   dlg_srch_shown = False
   dlg_srch_undo = []
   dlg_srch_redo = []
-  dlg_srch_fn_cache = {}
 
 
 #
@@ -3862,7 +4776,7 @@ def SearchList_Clear():
 # The function is used when the window is newly opened or a new file is loaded.
 #
 def SearchList_Init():
-  global dlg_srch_shown, dlg_srch_lines, dlg_srch_fn_cache, dlg_srch_tick_root
+  global dlg_srch_shown, dlg_srch_lines, dlg_srch_tick_root
   global dlg_srch_undo, dlg_srch_redo
 
   if dlg_srch_shown:
@@ -3870,7 +4784,6 @@ def SearchList_Init():
     dlg_srch_undo = []
     dlg_srch_redo = []
     dlg_srch_tick_root = -1
-    dlg_srch_fn_cache = {}
 
 
 #
@@ -3925,7 +4838,7 @@ def SearchList_MenuPosted():
 def SearchList_ContextMenu(xcoo, ycoo):
   global tlb_find
   global dlg_srch_sel, dlg_srch_lines
-  global tick_pat_sep, tick_pat_num, tick_str_prefix, dlg_srch_fn_cache
+  global tick_pat_sep, tick_pat_num, tick_str_prefix
 
   dlg_srch_sel.TextSel_ContextSelection(xcoo, ycoo)
   sel = dlg_srch_sel.TextSel_GetSelection()
@@ -3943,7 +4856,7 @@ def SearchList_ContextMenu(xcoo, ycoo):
 
   if (len(sel) == 1) and ((tick_pat_sep != "") or (tick_pat_num != "")):
     line = dlg_srch_lines[sel[0]]
-    fn = ParseFrameTickNo("$line.0", dlg_srch_fn_cache)
+    fn = ParseFrameTickNo("%d.0" % line)
     if fn != "":
       if c > 0: wt.dlg_srch_ctxmen.add_separator()
       wt.dlg_srch_ctxmen.add_command(label="Select line as origin for tick delta", command=SearchList_SetFnRoot)
@@ -4035,7 +4948,7 @@ def SearchList_SearchNext(is_fwd):
 # the display of frame numbers in front of each line on/off.
 #
 def SearchList_ToggleFrameNo():
-  global dlg_srch_sel, dlg_srch_lines, dlg_srch_fn_cache, tick_pat_sep, tick_pat_num
+  global dlg_srch_sel, dlg_srch_lines, tick_pat_sep, tick_pat_num
   global dlg_srch_show_fn, dlg_srch_show_tick, dlg_srch_tick_delta, dlg_srch_tick_root
 
   if (tick_pat_sep != "") or (tick_pat_num != ""):
@@ -4044,7 +4957,7 @@ def SearchList_ToggleFrameNo():
         sel = dlg_srch_sel.TextSel_GetSelection()
         if len(sel) > 0:
           line = dlg_srch_lines[sel[0]]
-          fn = ParseFrameTickNo("%d.0" % line, dlg_srch_fn_cache)
+          fn = ParseFrameTickNo("%d.0" % line)
           if fn != "":
             dlg_srch_tick_root = fn.split(" ")[0]
           else:
@@ -4068,7 +4981,7 @@ def SearchList_ToggleFrameNo():
 # frame number delta display, which requires a complete refresh of the list.
 #
 def SearchList_SetFnRoot():
-  global dlg_srch_sel, dlg_srch_lines, dlg_srch_fn_cache, tick_pat_sep, tick_pat_num
+  global dlg_srch_sel, dlg_srch_lines, tick_pat_sep, tick_pat_num
   global dlg_srch_show_fn, dlg_srch_show_tick, dlg_srch_tick_delta, dlg_srch_tick_root
 
   if (tick_pat_sep != "") or (tick_pat_num != ""):
@@ -4077,7 +4990,7 @@ def SearchList_SetFnRoot():
       if len(sel) > 0:
         line = dlg_srch_lines[sel[0]]
         # extract the frame number from the text in the main window around the referenced line
-        fn = ParseFrameTickNo("%d.0" % line, dlg_srch_fn_cache)
+        fn = ParseFrameTickNo("%d.0" % line)
         if fn != "":
           dlg_srch_tick_delta = 1
           dlg_srch_tick_root = fn.split(" ")[0]
@@ -4321,6 +5234,50 @@ def SearchList_StartSearchAll(pat_list, do_add, direction):
     tid_search_list = tk.after(10, lambda: SearchList_BgSearchLoop(pat_list, do_add, direction, line, 0, 0))
 
 
+#
+# This function searches for the next line at or after the given line (or
+# the previous line before the given line when the direction is negative)
+# which matches the given pattern. The search is done using Python's reg.exp.
+# engine on the copy of the text content; the text widget is used only for
+# patterns that cannot be compiled by Python. Returns the line number, or -1
+# if there is no match.
+#
+def SearchList_FindLine(pat, opt, line, direction):
+  rx = Highlight_CompileRe(pat, opt)
+  if rx is not None:
+    lines = HighlightGetLines()
+    search = rx.search
+    if (direction >= 0) and Highlight_IsLineLocal(rx):
+      # search forward in the complete text in a single pass, instead of line by line
+      # (the search ends before the newline of the last line, so "$" matches there only at a line end)
+      if line >= len(lines):
+        return -1
+      (text, offsets) = HighlightGetText()
+      end_off = offsets[len(lines) - 1] - 1
+      match = search(text, offsets[line - 1], end_off)
+      while match is not None:
+        line = bisect.bisect_right(offsets, match.start())
+        # matches spanning multiple lines are verified on the start line alone
+        if (text.find("\n", match.start(), match.end()) < 0) or search(lines[line - 1]):
+          return line
+        match = search(text, offsets[line], end_off)
+    elif direction >= 0:
+      for line in range(line, len(lines)):
+        if search(lines[line - 1]):
+          return line
+    else:
+      for line in range(line - 1, 0, -1):
+        if search(lines[line - 1]):
+          return line
+    return -1
+
+  else:
+    pos = wt.f1_t.search(pat, "%d.0" % line, ("end" if direction >= 0 else "1.0"), **opt)
+    if pos == "":
+      return -1
+    return int(pos[:pos.index(".")])
+
+
 #
 # This function acts as background process to fill the search list window.
 # The search loop continues for at most 100ms, then the function re-schedules
@@ -4346,17 +5303,14 @@ def SearchList_BgSearchLoop(pat_list, do_add, direction, line, pat_idx, loop_cnt
     opt = Search_GetOptions(pat, hl[1], hl[2], (0 if direction < 0 else 1))
     line_list = []
     off = 0
-    if direction >= 0:
-      last_line = "end"
-    else:
-      last_line = "1.0"
 
+    found = -1
     while line < max_line:
-      pos = wt.f1_t.search(pat, ("%d.0" % line), last_line, **opt)
-      if pos == "":
+      found = SearchList_FindLine(pat, opt, line, direction)
+      if found < 0:
         break
 
-      line = int(pos.split(".")[0])
+      line = found
       idx = SearchList_GetLineIdx(line)
       if do_add:
         if (idx >= len(dlg_srch_lines)) or (dlg_srch_lines[idx] != line):
@@ -4388,7 +5342,7 @@ def SearchList_BgSearchLoop(pat_list, do_add, direction, line, pat_idx, loop_cnt
       # select previously selected line again
       SearchList_SeeViewAnchor(anchor)
 
-    if (line < max_line) and (pos != ""):
+    if (line < max_line) and (found >= 0):
       # create or update the progress bar
       if direction == 0:
         ratio = line / max_line
@@ -4859,6 +5813,31 @@ def SearchList_HighlightLine(tag, line):
           pass
 
 
+#
+# This function is a variant of the above for a sorted list of lines. The
+# checks for the dialog state are done only once, which is relevant as
+# highlighting passes large numbers of lines when the dialog is closed.
+#
+def SearchList_HighlightLines(tag, lines):
+  global dlg_srch_shown, dlg_srch_highlight, dlg_srch_lines
+  global tid_high_init
+
+  if dlg_srch_shown:
+    if dlg_srch_highlight or (tid_high_init is not None):
+      # (both lists are sorted, so each lookup can start at the previous result)
+      list_lines = []
+      idx = 0
+      for line in lines:
+        idx = bisect.bisect_left(dlg_srch_lines, line, idx)
+        if (idx < len(dlg_srch_lines)) and (dlg_srch_lines[idx] == line):
+          list_lines.append(idx + 1)
+      if list_lines:
+        try:
+          HighlightAddTag(wt.dlg_srch_f1_l, tag, list_lines)
+        except:
+          pass
+
+
 #
 # This function is bound to the "Toggle highlight" checkbutton in the
 # search list dialog's menu.  The function enables or disables search highlight.
@@ -4895,6 +5874,30 @@ def SearchList_MatchView(line):
       wt.dlg_srch_f1_l.mark_set("insert", "end")
 
 
+#
+# This function is a variant of the above which is used by cursor movement
+# commands: the view is adjusted via a short timer, so that a burst of cursor
+# movements (e.g. via auto-repeat) results in a single update for the last one.
+#
+def SearchList_MatchViewDelayed(line):
+  global dlg_srch_shown, dlg_srch_view_line, tid_search_view
+
+  if dlg_srch_shown:
+    dlg_srch_view_line = line
+    if tid_search_view is None:
+      tid_search_view = tk.after(20, SearchList_MatchViewTimer)
+
+
+#
+# This function is invoked by the timer started by the above function.
+#
+def SearchList_MatchViewTimer():
+  global dlg_srch_view_line, tid_search_view
+
+  tid_search_view = None
+  SearchList_MatchView(dlg_srch_view_line)
+
+
 #
 # This function is called when a bookmark is added or removed in the main
 # window.  The function displays the bookmark in the respective line in
@@ -4943,16 +5946,16 @@ def SearchList_ToggleMark():
 #
 def SearchList_InsertLine(line_idx, ins_pos):
   global dlg_srch_show_fn, dlg_srch_show_tick, dlg_srch_tick_delta, dlg_srch_tick_root
-  global dlg_srch_fn_cache
   global tick_str_prefix, img_marker, mark_list
 
   # copy text content and tags out of the main window
+  # (the text is taken from the copy of the content which is used for searching)
   pos = "%d.0" % line_idx
-  dump = ExtractText(pos + " linestart", pos + " lineend")
+  dump = HighlightGetLines()[line_idx - 1]
   tag_list = [x for x in wt.f1_t.tag_names(pos) if x.startswith("tag")]
 
   if dlg_srch_tick_delta or dlg_srch_show_fn or dlg_srch_show_tick:
-    fn = ParseFrameTickNo(pos, dlg_srch_fn_cache)
+    fn = ParseFrameTickNo(pos)
     if fn != "":
       try:
         tick_no = int(fn.split(" ")[0])
@@ -5077,7 +6080,7 @@ def SearchList_GetLen():
 # + bottom_l: this line and all below have been removed, or 0 if none
 #
 def SearchList_AdjustLineNums(top_l, bottom_l):
-  global dlg_srch_sel, dlg_srch_lines, dlg_srch_undo, dlg_srch_redo, dlg_srch_fn_cache
+  global dlg_srch_sel, dlg_srch_lines, dlg_srch_undo, dlg_srch_redo
 
   if dlg_srch_lines:
     if bottom_l == 0:
@@ -5110,7 +6113,6 @@ def SearchList_AdjustLineNums(top_l, bottom_l):
 
     dlg_srch_undo = tmp2
     dlg_srch_redo = []
-    dlg_srch_fn_cache = {}
 
 
 #
@@ -5802,6 +6804,7 @@ def TagList_CopyFromSearch(pat_idx):
 
       # apply the tag to the text content
       wt.f1_t.tag_remove(w[4], "1.0", "end")
+      Highlight_DiscardCovered(w[4])
       opt = Search_GetOptions(w[0], w[1], w[2])
       HighlightAll(w[0], w[4], opt)
 
@@ -5834,6 +6837,7 @@ def TagList_Remove(pat_sel):
 
           # remove the highlight in the main window
           wt.f1_t.tag_delete(tagname)
+          Highlight_DiscardCovered(tagname)
 
           # remove the highlight in other dialogs, if currently open
           SearchList_DeleteTag(tagname)
@@ -6288,6 +7292,7 @@ def Markup_Save(do_save, do_quit):
 
         # remove the tag and re-apply to the text
         wt.f1_t.tag_remove(tagnam, "1.0", "end")
+        Highlight_DiscardCovered(tagnam)
 
         opt = Search_GetOptions(w[0], w[1], w[2])
         HighlightAll(w[0], tagnam, opt)
@@ -7147,9 +8152,12 @@ class TextSel(object):
     # first remove any existing highlight
     self.wid.tag_remove("sel", "1.0", "end")
 
-    # select each selected line (may be non-consecutive)
-    for line in self.sel:
-      self.wid.tag_add("sel", "%d.0" % (line + 1), "%d.0" % (line + 2))
+    # select each selected line (may be non-consecutive) using a single call
+    if len(self.sel) > 0:
+      ranges = []
+      for line in self.sel:
+        ranges.extend(("%d.0" % (line + 1), "%d.0" % (line + 2)))
+      self.wid.tag_add("sel", *ranges)
 
     if (len(self.sel) == 0) or (self.anchor_idx == -1):
       self.wid.mark_set("insert", "end")
@@ -7659,13 +8667,13 @@ def InitContent():
   global tid_search_inc, tid_search_hall, tid_high_init
   global cur_filename, load_pipe, dlg_mark_shown
 
-  if tid_high_init is not None: tk.after_cancel(tid_high_init)
-  if tid_search_inc is not None: tk.after_cancel(tid_search_inc)
+  HighlightInitCancel()
+  Search_BackgroundCancel()
   if tid_search_hall is not None: tk.after_cancel(tid_search_hall)
-  tid_high_init = None
-  tid_search_inc = None
   tid_search_hall = None
 
+  HighlightDiscardLines()
+
   # window title and main menu
   if cur_filename != "":
     tk.title(cur_filename + " - Trace browser")
@@ -7688,8 +8696,8 @@ def InitContent():
   wt.f1_t.mark_set("insert", "end")
   CursorMoveLine(wt.f1_t, 0)
 
-  global cur_jump_stack
-  cur_jump_stack = []
+  global cur_jump_stack, cur_jump_idx
+  cur_jump_stack = collections.OrderedDict()
   cur_jump_idx = -1
   # read bookmarks from the default file
   Mark_ReadFileAuto()
@@ -7713,6 +8721,7 @@ def DiscardContent():
 
   # discard the current trace content
   wt.f1_t.delete("1.0", "end")
+  HighlightDiscardLines()
 
   SearchReset()
 
@@ -7784,17 +8793,16 @@ def MenuCmd_Discard(is_fwd):
 
         # perform the removal
         wt.f1_t.delete("%d.%d" % (first_l, first_c), "%d.%d" % (last_l, last_c))
+        HighlightDiscardLines()
 
         # re-start initial highlighting, if not complete yet
         global tid_high_init
         if tid_high_init is not None:
-          tk.after_cancel(tid_high_init)
-          tid_high_init = None
           HighlightInit()
 
         SearchReset()
         global cur_jump_stack, cur_jump_idx
-        cur_jump_stack = []
+        cur_jump_stack = collections.OrderedDict()
         cur_jump_idx = -1
 
         MarkList_AdjustLineNums(1 if is_fwd else last_l, first_l if is_fwd else 0)
@@ -8057,6 +9065,7 @@ def UpdateRcFile():
 
   if tid_update_rc_sec: tk.after_cancel(tid_update_rc_sec)
   if tid_update_rc_min: tk.after_cancel(tid_update_rc_min)
+  tid_update_rc_sec = None
   tid_update_rc_min = None
 
   try:
@@ -8160,17 +9169,35 @@ def UpdateRcFile():
 # The write is delayed by a few seconds to avoid writing the file multiple
 # times when multiple values are changed. This timer is restarted when
 # another change occurs during the delay, however only up to a limit.
+# (To keep this function cheap when called in bursts, the timer is not
+# restarted here; instead it extends itself upon expiry if needed.)
 #
 def UpdateRcAfterIdle():
-  global tid_update_rc_sec, tid_update_rc_min
+  global tid_update_rc_sec, tid_update_rc_min, rc_update_deadline
 
-  if tid_update_rc_sec: tk.after_cancel(tid_update_rc_sec)
-  tid_update_rc_sec = tk.after(3000, UpdateRcFile)
+  rc_update_deadline = time.monotonic_ns() + 3000000000
+  if not tid_update_rc_sec:
+    tid_update_rc_sec = tk.after(3000, UpdateRcTimer)
 
   if not tid_update_rc_min:
     tid_update_rc_min = tk.after(60000, UpdateRcFile)
 
 
+#
+# This function is invoked by the timer started above. It writes the RC file,
+# or restarts the timer if further changes occurred in the meantime.
+#
+def UpdateRcTimer():
+  global tid_update_rc_sec, rc_update_deadline
+
+  delay = (rc_update_deadline - time.monotonic_ns()) // 1000000
+  if delay > 0:
+    tid_update_rc_sec = tk.after(delay, UpdateRcTimer)
+  else:
+    tid_update_rc_sec = None
+    UpdateRcFile()
+
+
 # ----------------------------------------------------------------------------
 #
 # This function is called when the program is started with -help to list all
@@ -8368,14 +9395,28 @@ tlb_find_focus = 0
 
 # This variable contains the name of the widget which had input focus before
 # the focus was moved into the search entry field. Focus will return there
-# after Return or Escape
+# after Return or Escape. The second variable caches its toplevel window.
 tlb_last_wid = None
+tlb_last_top = None
 
 # These variables hold the cursor position and Y-view from before the start of an
 # incremental search (they are used to move the cursor back to the start position)
 tlb_inc_base = None
 tlb_inc_view = None
 
+# This variable is incremented upon each modification of the search text. It's
+# used to detect when an incremental search in progress has become obsolete.
+tlb_inc_epoch = 0
+
+# This variable holds the search text for which the last incremental search
+# was triggered, to ignore assignments that do not change the text.
+tlb_inc_text = ""
+
+# This variable holds the result of the last incremental search after a change
+# of the search text: a list of pattern, search options, start and end position
+# of the search, and the match position (or None while the search is ongoing).
+tlb_inc_last = None
+
 # These variables are used when cycling through the search history via the up/down
 # keys in the search text entry field. They hold the current index in the history
 # stack and the prefix string (i.e. the text in the entry field from before
@@ -8383,13 +9424,44 @@ tlb_inc_view = None
 tlb_hist_pos = None
 tlb_hist_prefix = None
 
+# These constant expressions are used by the search functions on every key
+# press in the search entry field, hence they are compiled only once: they
+# detect special characters in a search pattern and extract a word (or a
+# sequence of non-word characters) left or right of the cursor position.
+search_re_special = re.compile(r"[\.\\\*\+\?\(\[\{\^\$\|]")
+search_re_word_right = re.compile(r"^(?:\W+|\w+)")
+search_re_word_left = re.compile(r"(?:\W+|\w+)$")
+search_re_ident_right = re.compile(r"^[\w\-]+")
+search_re_ident_left = re.compile(r"[\w\-]+$")
+
+# These constant expressions are used for moving the cursor by words, indexed
+# by the parameters of CursorMoveWord: direction, word type and target.
+cursor_re_word = {(True, True, True): re.compile(r"^\s*\S*"),
+                  (True, True, False): re.compile(r"^\S*\s*"),
+                  (True, False, True): re.compile(r"^\W*\w*"),
+                  (True, False, False): re.compile(r"^\w*\W*"),
+                  (False, True, True): re.compile(r"\s(\s+)$"),
+                  (False, True, False): re.compile(r"(\S+\s*)$"),
+                  (False, False, True): re.compile(r"\w(\W+\w*)$"),
+                  (False, False, False): re.compile(r"(\w+|\w+\W+)$")}
+
 # This variable is used to parse multi-key command sequences.
 last_key_char = ""
 
-# This list remembers cursor positions preceding "large jumps" (i.e. searches,
+# This dict contains the keys which move the cursor by one character, and the
+# direction. For these keys, repetitions in the command dialog are combined.
+keycmd_char_moves = {"<Key-space>": 1, "<Key-BackSpace>": -1, "<Key-l>": 1, "<Key-h>": -1}
+
+# This dict contains the keys which move the cursor by words, and the
+# respective parameters of CursorMoveWord.
+keycmd_word_moves = {"<Key-w>": (1, 0, 0), "<Key-e>": (1, 0, 1), "<Key-b>": (0, 0, 0),
+                     "<Key-W>": (1, 1, 0), "<Key-E>": (1, 1, 1), "<Key-B>": (0, 1, 0)}
+
+# This dict remembers cursor positions preceding "large jumps" (i.e. searches,
 # or positioning commands "G", "H", "L", "M" etc.) Used to allow jumping back.
+# Keys are line numbers, values are text indices, ordered from oldest to newest.
 # The second variable is used when jumping back and forward inside the list.
-cur_jump_stack = []
+cur_jump_stack = collections.OrderedDict()
 cur_jump_idx = -1
 
 # This hash array stores the bookmark list. Array keys are text line numbers,
@@ -8408,6 +9480,7 @@ dlg_mark_list = []
 # by "after")  They are used to cancel the scripts when necessary.
 tid_search_inc = None
 tid_search_list = None
+tid_search_view = None
 tid_search_hall = None
 tid_high_init = None
 tid_update_rc_sec = None
@@ -8415,6 +9488,48 @@ tid_update_rc_min = None
 tid_status_line = None
 tid_resume_bg = None
 
+# This variable holds an event object which is used to stop the background
+# thread of the initial highlighting, or None when no such thread is active.
+high_init_abort = None
+
+# This variable holds the list of patterns, tag names and search options of
+# the initial highlighting while it's ongoing, for use by the yview callback.
+high_init_pats = None
+
+# This variable holds an event object which is used to stop the background
+# thread of an incremental search, or None when no such thread is active.
+search_inc_abort = None
+
+# This variable holds a copy of the main text content as a list of lines, as
+# used for highlighting; None when not fetched yet or when the text has changed.
+# The second variable holds the same as a single string plus line offsets
+# (the latter are None until needed).
+highlight_lines = None
+highlight_text = None
+
+# This dict caches compiled reg.exp. for highlight and search patterns. Keys
+# are tuples of pattern, reg.exp. and ignore-case flags.
+highlight_re_cache = {}
+
+# This constant expression detects Tcl reg.exp. syntax which Python compiles
+# with a different meaning: POSIX bracket expressions ("[[:digit:]]", "[[.x.]]",
+# "[[=x=]]"), "\b" (a backspace in Tcl, a word boundary in Python) and "\B"
+# (a backslash in Tcl, a non-word-boundary in Python). Note matches of escaped
+# characters (e.g. "\[:") only cause a fall-back to the slower search via the
+# text widget.
+highlight_re_tcl_only = re.compile(r"\[[:.=]|\\[bB]")
+
+# This constant expression detects reg.exp. syntax for which searching in the
+# complete text differs from searching in single lines: "\A" and "\Z" as well
+# as all "(?" groups other than "(?:" and "(?P", i.e. look-around assertions
+# and inline flags. For such patterns the text is searched line by line.
+highlight_re_line_only = re.compile(r"\\[AZ]|\(\?[^:P]")
+
+# This dict holds line ranges for which all matches of a highlight or search
+# pattern have been tagged. Keys are tuples of tag name, pattern, reg.exp.
+# and ignore-case flags; values are sorted lists of (first, end) line ranges.
+highlight_covered = {}
+
 # This variable is incremented for temporarily suspending background tasks
 # while an interactive operation is performed (e.g. a dialog window is opened.)
 # The variable is decremented at the end of that task. The last decrement to
@@ -8426,6 +9541,14 @@ block_bg_caller = []
 
 # This array contains key bindings for different dialog windows.
 key_cmd_reg = {}
+
+# This dict contains handlers for the second key of multi-key command
+# sequences, indexed by the first key of the sequence.
+key_cmd_prefix = {"'": KeyCmd_SeqQuote,
+                  "z": KeyCmd_SeqBinding,
+                  "g": KeyCmd_SeqBinding,
+                  "f": lambda wid, reg, char: SearchCharInLine(char, 1),
+                  "F": lambda wid, reg, char: SearchCharInLine(char, -1)}
 last_inline_char = None
 last_inline_dir = None
 
@@ -8434,6 +9557,22 @@ last_inline_dir = None
 # which is used to allow clearing the message before the regular expiry time.
 status_line_topic = None
 
+# This variable holds the bold variant of the content font, which is used by
+# highlight tags. It's derived upon first use and reset when the font changes.
+font_content_bold = None
+
+# This variable caches the line height of the content font in pixels, which is
+# used for scrolling. It's queried upon first use and reset when the font changes.
+font_content_linespace = None
+
+# This variable holds the actual attributes of the content font (a dict) at the
+# time it was last applied, which is used to skip applying an unchanged font.
+font_content_applied = None
+
+# This dict caches the size of text widgets (width, height) in pixels, which is
+# used for scrolling. Entries are removed when the respective widget is resized.
+win_size_cache = {}
+
 # These variable are set to True while the respective dialog is open. The
 # variables are reset to False via widget destruction callback. The variables
 # are checked in various dialog handler functions and hooks to skip processing
@@ -8447,6 +9586,10 @@ dlg_mark_shown = False
 dlg_srch_shown = False
 dlg_tags_shown = False
 
+# This variable holds the main window's line number to be made visible in the
+# search result list by a pending timer (see SearchList_MatchViewDelayed).
+dlg_srch_view_line = 0
+
 # These variables hold the font and color definitions for the main text content.
 font_content_opt = {"family": "helvetica", "size": 9, "weight": tkf.NORMAL}
 col_bg_content = "#e2e2e8"
@@ -8509,6 +9652,20 @@ tick_pat_sep = ""
 tick_pat_num = ""
 tick_str_prefix = ""
 
+# This dict caches the frame number prefix (see ParseFrameTickNo) of text lines,
+# indexed by line number. The entry with key -1 holds the range of lines of
+# the most recently parsed frame and its prefix. The cache is cleared when
+# the text content changes.
+tick_fn_cache = {}
+
+# This list caches the offsets of frame separator pattern matches in the copy
+# of the text content (see ParseFrameTick_GetSeparators), or None if unknown.
+tick_sep_offsets = None
+
+# This constant expression is used for extracting the frame number from the
+# line matched by the above frame separator pattern.
+tick_re_no = re.compile(r"[1-9][0-9]*")
+
 # This list stores text patterns and associated colors for color-highlighting
 # in the main text window. Each list entry is again a list:
 # 0: sub-string or regular expression
@@ -8544,6 +9701,10 @@ rcfile_version = 0x02000002
 myrcfile = ".trowserc.py"
 rc_file_error = 0
 
+# This variable holds the time (in nanoseconds, see time.monotonic_ns) after
+# which the RC file is written, which is postponed while settings are changed.
+rc_update_deadline = 0
+
 #
 # Main
 #
@@ -8561,6 +9722,8 @@ tlb_case = BooleanVar(tk, tlb_case)
 tlb_regexp = BooleanVar(tk, tlb_regexp)
 tlb_hall = BooleanVar(tk, tlb_hall)
 tlb_find = StringVar(tk, tlb_find)
+# this variable receives the match length of text widget searches (shared to avoid creating a Tcl variable per search)
+search_match_len = IntVar(tk, 0)
 font_content = tkf.Font(**font_content_opt)
 
 # Parse command line parameters & load configuration options